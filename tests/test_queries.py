@@ -0,0 +1,27 @@
+import pytest
+from django.core.cache import cache
+
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestQueryAudit:
+
+    @pytest.mark.query_audit
+    def test_index_has_no_n_plus_one(self, client, few_posts_with_group):
+        cache.clear()
+        response = client.get('/')
+        assert response.status_code == 200
+
+    @pytest.mark.query_audit
+    def test_group_page_has_no_n_plus_one(self, client, few_posts_with_group):
+        cache.clear()
+        response = client.get(f'/group/{few_posts_with_group.group.slug}/')
+        assert response.status_code == 200
+
+    def test_fixture_reports_n_plus_one(self, query_audit, few_posts_with_group):
+        with pytest.raises(AssertionError, match='N\\+1'):
+            with query_audit():
+                for post in Post.objects.all():
+                    post.group.title
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'run_at', 'attempts', 'failed')
+    search_fields = ('name',)
+    list_filter = ('failed', 'name')
+    readonly_fields = ('created',)
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,21 @@
+"""SQLite для разработки и небольших установок, настроенный на конкуренцию.
+
+Каждое новое соединение получает PRAGMA из ключа PRAGMAS настроек базы:
+журнал WAL позволяет читать во время записи, а busy_timeout заставляет
+писателя ждать освобождения блокировки, а не сразу падать с «database
+is locked». Транзакции начинаются с BEGIN IMMEDIATE: при обычном BEGIN
+транзакция, которая сначала читает, а потом пишет, получает ошибку
+блокировки без всякого ожидания, если другой писатель успел раньше.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,104 @@
+"""Общие приёмы работы с кэшем.
+
+get_or_compute защищает горячие ключи от одновременного пересчёта,
+get_many_or_add читает бессрочные версии и отметки времени.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+
+from . import perf
+
+LOCK_TIMEOUT = 30
+WAIT_STEP = 0.05
+
+
+class Uncacheable(Exception):
+    """compute() сообщает, что его результат нельзя класть в кэш."""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+def get_or_compute(key, compute, timeout, beta=1.0,
+                   lock_timeout=LOCK_TIMEOUT, is_fresh=None):
+    """Значение ключа из кэша; при промахе его считает только один воркер.
+
+    Пока один воркер пересчитывает значение, остальные получают
+    устаревшее, а если его нет — ждут готового. Ближе к концу срока
+    значение пересчитывается заранее с растущей вероятностью (XFetch),
+    чтобы горячий ключ не истекал у всех воркеров одновременно.
+
+    is_fresh(value) может признать значение устаревшим раньше срока,
+    например после сброса версий. compute() может вернуть значение
+    мимо кэша, выбросив Uncacheable(value).
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        early = delta * beta * math.log(1 - random.random())
+        if time.time() - early < expires and (
+                is_fresh is None or is_fresh(value)):
+            perf.count_cache(hits=1)
+            return value
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, True, lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        entry = _wait(key, lock_key, lock_timeout)
+        if entry is not None:
+            return entry[0]
+    perf.count_cache(misses=1)
+    try:
+        started = time.time()
+        try:
+            value = compute()
+        except Uncacheable as result:
+            return result.value
+        finished = time.time()
+        # Запись живёт вдвое дольше срока: её можно отдать устаревшей,
+        # пока кто-то один считает новое значение.
+        cache.set(
+            key,
+            (value, finished - started,
+             math.inf if timeout is None else finished + timeout),
+            None if timeout is None else timeout * 2,
+        )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def _wait(key, lock_key, lock_timeout):
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None or cache.get(lock_key) is None:
+            return entry
+    return None
+
+
+def new_version():
+    return uuid.uuid4().hex
+
+
+def get_many_or_add(keys, make=new_version):
+    """Значения бессрочных ключей; пропавшие заводятся заново.
+
+    Версию или отметку времени может вытеснить сам кэш. Пропавший ключ
+    получает новое значение make(), и всё, что строилось на старом,
+    перестаёт с ним совпадать.
+    """
+    found = cache.get_many(keys)
+    for key in set(keys) - found.keys():
+        # add, а не set: параллельный запрос мог уже завести значение.
+        cache.add(key, make(), None)
+        found[key] = cache.get(key)
+    return found
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Файловый кэш, общий для воркеров, с атомарным add().
+
+    Стандартный add() сначала проверяет ключ, а потом пишет его, поэтому
+    два процесса могут оба «захватить» ключ. Здесь файл ключа создаётся
+    через os.link, который не перезаписывает существующий файл.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # has_key() заодно удаляет файл истёкшей записи.
+        if self.has_key(key, version):  # noqa: W601
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
@@ -1,9 +1,14 @@
 from datetime import datetime
 
+from django.utils.functional import SimpleLazyObject
+
 
 def year(request):
-    """Добавляет переменную с текущим годом."""
-    today = datetime.now()
-    return {
-        'year': today.year,
-    }
+    """Добавляет переменную с текущим годом.
+
+    Год вычисляется, только если шаблон его выводит, и один раз на
+    запрос, сколько бы шаблонов с контекстом запроса ни рисовалось.
+    """
+    if not hasattr(request, '_year'):
+        request._year = SimpleLazyObject(lambda: datetime.now().year)
+    return {'year': request._year}
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = ('Выполняет задачи из очереди core.tasks. Без --burst работает, '
+            'пока не прервут, и проверяет очередь каждые --interval секунд. '
+            'Воркеров можно запускать несколько.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить созревшие задачи и выйти.')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько задач забирать за раз.')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза, когда очередь пуста, в секундах.')
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Сначала вернуть в очередь задачи, исчерпавшие попытки.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            returned = tasks.retry_failed()
+            self.stdout.write(f'Возвращено в очередь: {returned}')
+        total_succeeded = total_failed = 0
+        while True:
+            close_old_connections()
+            succeeded, failed = tasks.run_due(options['batch_size'])
+            total_succeeded += succeeded
+            total_failed += failed
+            if succeeded or failed:
+                continue
+            if options['burst']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(
+            f'Выполнено задач: {total_succeeded}, с ошибкой: {total_failed}')
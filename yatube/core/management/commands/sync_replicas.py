@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, target):
+    """Копирует файл SQLite целиком через backup API, не мешая записи."""
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(target)
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из DB_REPLICAS, '
+            'чтобы проверить чтение с реплик локально. С --interval '
+            'повторяет копирование, изображая отстающую репликацию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Копировать каждые столько секунд, пока не прервут.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Реплики PostgreSQL обновляет сама база.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не заданы: укажите DB_REPLICAS.')
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(primary.settings_dict['NAME'],
+                              connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f'Реплики обновлены: {", ".join(settings.DATABASE_REPLICAS)}')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, помеченной core.tasks.task."""
+    name = models.CharField('Функция', max_length=200)
+    payload = models.TextField('Аргументы', help_text='JSON: args и kwargs')
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Попыток не больше')
+    failed = models.BooleanField('Не удалась', default=False)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta():
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['failed', 'run_at'], name='task_due'),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,76 @@
+"""Меню сайта (includes/nav.html).
+
+Адреса ссылок меню вычисляются reverse() один раз на процесс, а HTML
+меню запоминается в памяти процесса для каждого сочетания «вошёл ли
+пользователь» и «какой пункт активен»; имя пользователя дописывается
+к готовому HTML. warm() готовит всё это при старте воркера (wsgi.py).
+Без TEMPLATE_CACHE меню рисуется заново, чтобы правки шаблона были
+видны сразу.
+"""
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+MENU_TEMPLATE = 'includes/nav_menu.html'
+
+LINKS = {
+    'author': 'about:author',
+    'tech': 'about:tech',
+    'search': 'posts:search',
+    'post_create': 'posts:post_create',
+    'password_change': 'users:password_change',
+    'logout': 'users:logout',
+    'login': 'users:login',
+    'signup': 'users:signup',
+}
+# Страницы, пункт которых подсвечивается в меню; на остальных меню одно.
+ACTIVE = ('about:author', 'about:tech', 'posts:search', 'posts:post_create')
+
+_urls = {}
+_menus = {}
+
+
+def urls():
+    """Адреса ссылок меню по ключам LINKS."""
+    if not _urls:
+        _urls.update(
+            (name, reverse(view_name)) for name, view_name in LINKS.items())
+    return _urls
+
+
+def _menu_items(authenticated, view_name):
+    key = (authenticated, view_name)
+    html = _menus.get(key)
+    if html is None:
+        html = render_to_string(MENU_TEMPLATE, {
+            'authenticated': authenticated,
+            'view_name': view_name,
+            'urls': urls(),
+        })
+        if settings.TEMPLATE_CACHE:
+            _menus[key] = html
+    return html
+
+
+def menu(user, view_name):
+    """HTML меню для пользователя на странице view_name."""
+    authenticated = user is not None and user.is_authenticated
+    items = _menu_items(
+        authenticated, view_name if view_name in ACTIVE else None)
+    user_item = ''
+    if authenticated:
+        user_item = format_html(
+            '<li class="nav-item">Пользователь: {}</li>', user.username)
+    return format_html(
+        '<ul class="nav nav-pills">{}{}</ul>', mark_safe(items), user_item)
+
+
+def warm():
+    """Вычисляет адреса и рисует меню для всех страниц заранее."""
+    _urls.clear()
+    _menus.clear()
+    for authenticated in (False, True):
+        for view_name in (None, *ACTIVE):
+            _menu_items(authenticated, view_name)
@@ -0,0 +1,110 @@
+"""Кэш целых страниц для анонимных читателей.
+
+Ответ на GET без входа на сайт сохраняется по пути со строкой запроса
+вместе с версиями областей данных, из которых страница собрана. Области
+— строки вроде 'post:5', их называет сама вьюха через tag(). purge()
+меняет версии областей, и из кэша перестают отдаваться ровно те
+страницы, что от них зависят. Любая страница зависит ещё и от области
+ALL: её сброс убирает из кэша всё.
+
+Кэшируется только ответ 200 без cookie: страница, выдавшая токен CSRF
+или сессию, уже личная. Ответ помечается Vary: Cookie, чтобы
+промежуточные кэши не отдали его вошедшему пользователю. Срок
+PAGE_CACHE_TIMEOUT — лишь страховка, при 0 кэш выключен.
+
+Промах идёт через core.cache.get_or_compute: сброшенную горячую
+страницу заново собирает один воркер, остальные пока получают прежнюю.
+Страница не кладётся в кэш, если во время её сборки что-то сбросили:
+прочитанные вьюхой данные могли уже устареть. Сброс внутри транзакции
+повторяется после коммита — до него страницу могли собрать по старым
+данным.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+
+from .cache import Uncacheable, get_many_or_add, get_or_compute, new_version
+
+ALL = 'all'
+GENERATION_KEY = 'page_cache_generation'
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page_cache:{path}'
+
+
+def _scope_key(scope):
+    return f'page_cache_scope:{scope}'
+
+
+def tag(request, *scopes):
+    """Отмечает области данных, из которых собрана страница запроса."""
+    tagged = getattr(request, '_page_cache_scopes', None)
+    if tagged is not None:
+        tagged.update(scopes)
+
+
+def purge(*scopes):
+    """Убирает из кэша страницы, зависящие от любой из областей."""
+    keys = [_scope_key(scope) for scope in scopes]
+    _drop(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _drop(keys))
+
+
+def _drop(keys):
+    cache.delete_many(keys)
+    cache.set(GENERATION_KEY, new_version(), None)
+
+
+def _generation():
+    return get_many_or_add([GENERATION_KEY])[GENERATION_KEY]
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def _is_fresh(entry):
+    versions, _ = entry
+    return cache.get_many(list(versions)) == versions
+
+
+def cache_anonymous(view):
+    """Отдаёт анонимным читателям страницу вьюхи из кэша."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method != 'GET' or not settings.PAGE_CACHE_TIMEOUT
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+
+        def render():
+            generation = _generation()
+            request._page_cache_scopes = {ALL}
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if not _cacheable(request, response):
+                raise Uncacheable((None, response))
+            versions = get_many_or_add(
+                [_scope_key(scope) for scope in request._page_cache_scopes])
+            # Поколение не сменилось — значит, версии те же, что были до
+            # вьюхи, и страница собрана по данным не старше них.
+            if _generation() != generation:
+                raise Uncacheable((None, response))
+            return versions, response
+
+        _, response = get_or_compute(
+            _page_key(request), render, settings.PAGE_CACHE_TIMEOUT,
+            is_fresh=_is_fresh)
+        return response
+    return wrapper
@@ -0,0 +1,144 @@
+"""Замеры запросов в продакшене: время, SQL, шаблоны и кэш.
+
+PerformanceMiddleware замеряет случайную долю запросов
+(PERF_SAMPLE_RATE). Для каждого из них известны полное время, число и
+время SQL-запросов, время отрисовки шаблонов и попадания в кэш. Итог
+уходит в заголовок Server-Timing и одной JSON-строкой в лог
+«core.perf». При PERF_SAMPLE_RATE = 0 middleware отключается при
+старте и ничего не стоит.
+"""
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка SQL для connection.execute_wrapper()."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def current():
+    """Замеры текущего запроса или None, если он не замеряется."""
+    return getattr(_local, 'stats', None)
+
+
+def count_cache(hits=0, misses=0):
+    """Учитывает попадания и промахи кэша в замерах текущего запроса."""
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def instrument_templates():
+    """Оборачивает отрисовку шаблонов Django подсчётом времени.
+
+    Вложенные отрисовки (render_to_string внутри шаблона или тега)
+    входят во время внешней и отдельно не считаются.
+    """
+    from django.template.backends.django import Template
+
+    original = Template.render
+    if getattr(original, 'instrumented', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None or stats.template_depth:
+            return original(self, context, request)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_depth -= 1
+            stats.template_time += time.perf_counter() - started
+
+    render.instrumented = True
+    Template.render = render
+
+
+@contextmanager
+def measure():
+    """Замеряет SQL, шаблоны и кэш кода внутри блока в этом потоке.
+
+    Время шаблонов считается, только если вызван instrument_templates().
+    """
+    stats = _local.stats = RequestStats()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            yield stats
+    finally:
+        _local.stats = None
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.sample_rate = settings.PERF_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with measure() as stats:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'total;dur={_ms(total)}',
+                f'db;dur={_ms(stats.sql_time)};desc="{stats.queries} SQL"',
+                f'tpl;dur={_ms(stats.template_time)}',
+                f'cache;desc="hit {stats.cache_hits} '
+                f'miss {stats.cache_misses}"',
+            ))
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'sql_queries': stats.queries,
+            'sql_ms': _ms(stats.sql_time),
+            'template_ms': _ms(stats.template_time),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+        }, ensure_ascii=False))
+        return response
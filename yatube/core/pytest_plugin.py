@@ -0,0 +1,58 @@
+"""Проверка SQL-запросов из core.queries для тестов pytest.
+
+Подключается через pytest_plugins в conftest.py. Маркер проверяет весь
+тест, кроме фикстур, которые готовят данные::
+
+    @pytest.mark.query_audit(repeat_limit=3)
+    def test_index(client, few_posts_with_group):
+        client.get('/')
+
+а фикстура — только запросы внутри блока::
+
+    def test_index(client, query_audit):
+        with query_audit():
+            client.get('/')
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from core.queries import QueryAudit
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_audit(repeat_limit=None, slow_ms=None): тест падает, если '
+        'в нём есть N+1 или медленные SQL-запросы',
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_audit')
+    if marker is None:
+        yield
+        return
+    with QueryAudit(**marker.kwargs) as audit:
+        outcome = yield
+    if outcome.excinfo is None:
+        try:
+            audit.assert_clean()
+        except AssertionError as error:
+            # pluggy до 1.1 не умеет force_exception, но и не
+            # предупреждает об исключении после yield.
+            if not hasattr(outcome, 'force_exception'):
+                raise
+            outcome.force_exception(error)
+
+
+@pytest.fixture
+def query_audit():
+    @contextmanager
+    def audit(**options):
+        with QueryAudit(**options) as result:
+            yield result
+        result.assert_clean()
+
+    return audit
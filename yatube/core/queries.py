@@ -0,0 +1,163 @@
+"""Поиск N+1 и медленных SQL-запросов.
+
+QueryAudit собирает запросы, выполненные внутри блока with, и группирует
+их по форме: SQL без значений параметров, с IN (...) любой длины,
+сжатым до одного элемента. Одна и та же форма, повторённая
+QUERY_AUDIT_REPEAT_LIMIT раз и больше, — почти всегда N+1 (например,
+обращение к post.author в цикле без select_related). Запросы дольше
+QUERY_AUDIT_SLOW_MS тоже считаются проблемой.
+
+Пользоваться им можно так:
+
+* в тестах Django — блок ``with QueryAudit() as audit`` и
+  ``audit.assert_clean()``;
+* в pytest — фикстура ``query_audit`` или маркер
+  ``@pytest.mark.query_audit`` (см. core.pytest_plugin);
+* на работающем сайте — QueryAuditMiddleware при QUERY_AUDIT = True
+  пишет найденное в лог core.queries.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Служебные запросы транзакций повторяются законно.
+IGNORED = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+# Стандартная библиотека, сторонние пакеты и этот модуль.
+_SKIPPED_PATHS = (
+    os.path.dirname(os.__file__),
+    os.path.dirname(os.path.dirname(os.path.abspath(django.__file__))),
+    os.path.abspath(__file__),
+)
+
+
+def normalize(sql):
+    """Форма запроса: без литералов и с IN (?) вместо списка любой длины."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _caller():
+    """Первая строка кода проекта в стеке, откуда пришёл запрос."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(_SKIPPED_PATHS):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+class Shape:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.callers = OrderedDict()
+
+
+class QueryAudit:
+    def __init__(self, repeat_limit=None, slow_ms=None):
+        self.repeat_limit = (settings.QUERY_AUDIT_REPEAT_LIMIT
+                             if repeat_limit is None else repeat_limit)
+        self.slow_ms = (settings.QUERY_AUDIT_SLOW_MS
+                        if slow_ms is None else slow_ms)
+        self.shapes = OrderedDict()
+        self.slow = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка SQL для connection.execute_wrapper()."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if not IGNORED.match(sql):
+                self.record(sql, duration)
+
+    def record(self, sql, duration):
+        key = normalize(sql)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = Shape(key)
+        shape.count += 1
+        shape.duration += duration
+        caller = _caller()
+        shape.callers[caller] = shape.callers.get(caller, 0) + 1
+        if duration * 1000 >= self.slow_ms:
+            self.slow.append((sql, duration, caller))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    @property
+    def total(self):
+        return sum(shape.count for shape in self.shapes.values())
+
+    def repeated(self):
+        """Формы запросов, повторённые repeat_limit раз и больше."""
+        return [shape for shape in self.shapes.values()
+                if shape.count >= self.repeat_limit]
+
+    def problems(self):
+        """Описания найденных проблем, по одной строке на каждую."""
+        lines = []
+        for shape in self.repeated():
+            callers = ', '.join(
+                f'{caller} ×{count}' for caller, count in
+                shape.callers.items())
+            lines.append(f'N+1: {shape.count} одинаковых запросов '
+                         f'({callers}): {shape.sql}')
+        for sql, duration, caller in self.slow:
+            lines.append(f'Медленный запрос: {duration * 1000:.1f} ms '
+                         f'({caller}): {sql}')
+        return lines
+
+    def assert_clean(self):
+        problems = self.problems()
+        if problems:
+            raise AssertionError('\n'.join(problems))
+
+
+class QueryAuditMiddleware:
+    """Пишет в лог N+1 и медленные запросы каждого запроса к сайту."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_AUDIT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryAudit() as audit:
+            response = self.get_response(request)
+        for problem in audit.problems():
+            logger.warning('%s %s: %s', request.method, request.path,
+                           problem)
+        return response
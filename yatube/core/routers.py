@@ -0,0 +1,84 @@
+"""Чтение с реплик, запись в основную базу.
+
+ReplicaRouter отправляет чтения на случайную реплику из
+DATABASE_REPLICAS, а запись — в default. Реплика отстаёт от основной
+базы, поэтому поток, который уже что-то записал, дальше читает только
+из default, как и любой код внутри транзакции на default. Между
+запросами это помнит ReplicaPinMiddleware: после записи клиент получает
+cookie и ещё DATABASE_REPLICA_PIN_SECONDS секунд читает из основной базы,
+то есть сразу видит свой пост, комментарий или подписку.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary'
+
+_state = threading.local()
+
+
+def pinned():
+    return getattr(_state, 'pinned', False)
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    previous = pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or pinned()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = True
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему на реплики приносит репликация.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                         or PIN_COOKIE in request.COOKIES)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax')
+        finally:
+            _state.pinned = _state.wrote = False
+        return response
@@ -0,0 +1,18 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Закрывает постоянные соединения, которые перестали отвечать.
+
+    Аналог CONN_HEALTH_CHECKS из Django 4.1: с CONN_MAX_AGE соединение
+    живёт между запросами, и после перезапуска базы или пулера первый
+    запрос воркера иначе упал бы на мёртвом соединении.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,154 @@
+"""Очередь фоновых задач в базе данных, без внешнего брокера.
+
+Функция, помеченная @task, ставится в очередь через enqueue(func, ...)
+или func.delay(...). Аргументы сериализуются в JSON, поэтому передаются
+id, а не объекты. Задача записывается строкой Task, и ставить её нужно
+внутри того же transaction.atomic, что и изменение, которое её
+породило: тогда изменение не сохранится без задачи, а откат отменит
+обе. Вне транзакции строка пишется отдельным запросом после изменения,
+и при падении процесса между ними задача теряется. Поэтому Post.save
+атомарен вместе с сигналами, удаление и get_or_create атомарны в самом
+Django, а вьюхи ставят задачи в одной транзакции с записью.
+
+Выполняет задачи команда run_tasks. Воркер забирает созревшую задачу,
+сдвигая её run_at на TASK_LEASE_SECONDS вперёд; если он упадёт, задачу
+заберёт другой, когда срок истечёт. Удачная задача удаляется,
+неудачная повторяется через TASK_RETRY_DELAY секунд, с удвоением на
+каждой попытке, а после max_attempts попыток помечается failed. Задача
+выполняется хотя бы один раз, но может и дважды, поэтому она должна
+перечитывать состояние из базы и быть идемпотентной.
+
+С TASKS_EAGER задача выполняется сразу при постановке — так работают
+разработка и тесты, где воркера нет. Если она упала, её строка всё
+равно пишется в очередь, и повторит её воркер.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import routers
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, *, max_attempts=None):
+    """Помечает функцию модуля как задачу очереди."""
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        func.delay = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+    if func is None:
+        return register
+    return register(func)
+
+
+def enqueue(func, *args, **kwargs):
+    """Ставит вызов func(*args, **kwargs) в очередь.
+
+    Возвращает созданную Task или None, если задача уже выполнена
+    (TASKS_EAGER).
+    """
+    payload = json.dumps({'args': args, 'kwargs': kwargs})
+    max_attempts = func.max_attempts or settings.TASK_MAX_ATTEMPTS
+    if not settings.TASKS_EAGER:
+        return Task.objects.create(
+            name=func.task_name, payload=payload, max_attempts=max_attempts)
+    error = _call(func, payload)
+    if error is None:
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        payload=payload,
+        max_attempts=max_attempts,
+        attempts=1,
+        run_at=_retry_at(1),
+        failed=max_attempts <= 1,
+        last_error=error,
+    )
+
+
+def _call(func, payload):
+    """Выполняет задачу сразу, возвращает текст ошибки или None."""
+    data = json.loads(payload)
+    try:
+        # Ошибка задачи откатывает только её собственные изменения.
+        with transaction.atomic():
+            func(*data['args'], **data['kwargs'])
+    except Exception:
+        logger.exception('Задача %s не выполнена, её повторит воркер',
+                         func.task_name)
+        return traceback.format_exc()
+    return None
+
+
+def _retry_at(attempts):
+    delay = settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    return timezone.now() + timedelta(seconds=delay)
+
+
+def claim(limit):
+    """Забирает до limit созревших задач, которые не забрал другой воркер."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    with routers.use_primary():
+        due = list(Task.objects.filter(
+            failed=False, run_at__lte=now).values_list('id', 'run_at')[:limit])
+        claimed = []
+        for task_id, run_at in due:
+            # Забирает тот, чей UPDATE застал прежний run_at.
+            if Task.objects.filter(id=task_id, run_at=run_at).update(
+                    run_at=lease, attempts=F('attempts') + 1):
+                claimed.append(task_id)
+        return list(Task.objects.filter(id__in=claimed))
+
+
+def execute(task):
+    """Выполняет забранную задачу; возвращает True, если она удалась."""
+    try:
+        func = import_string(task.name)
+        if getattr(func, 'task_name', None) != task.name:
+            raise LookupError(f'{task.name} не помечена как задача')
+        data = json.loads(task.payload)
+        # Задача идёт сразу за записью: реплика могла её не получить.
+        with routers.use_primary():
+            func(*data['args'], **data['kwargs'])
+    except Exception:
+        logger.exception('Задача %s (%s) не выполнена, попытка %s из %s',
+                         task.name, task.id, task.attempts,
+                         task.max_attempts)
+        error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            Task.objects.filter(id=task.id).update(
+                failed=True, last_error=error)
+        else:
+            Task.objects.filter(id=task.id).update(
+                run_at=_retry_at(task.attempts), last_error=error)
+        return False
+    Task.objects.filter(id=task.id).delete()
+    return True
+
+
+def run_due(limit=100):
+    """Выполняет созревшие задачи, возвращает (удачных, неудачных)."""
+    succeeded = failed = 0
+    for task in claim(limit):
+        if execute(task):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def retry_failed():
+    """Возвращает в очередь задачи, исчерпавшие попытки."""
+    return Task.objects.filter(failed=True).update(
+        failed=False, attempts=0, run_at=timezone.now())
@@ -0,0 +1,45 @@
+"""Прогрев кэширующего загрузчика шаблонов.
+
+С TEMPLATE_CACHE кэширующий загрузчик разбирает каждый шаблон один раз
+на процесс, но делает это при первой отрисовке, то есть на первых
+запросах к сайту. warm() заранее загружает все шаблоны из DIRS и папок
+templates приложений; wsgi.py вызывает его при старте воркера.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Имена всех шаблонов в папках движка, без повторов."""
+    names = {}
+    for directory in (*engine.dirs, *get_app_template_dirs('templates')):
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename),
+                                       directory).replace(os.sep, '/')
+                names.setdefault(name, None)
+    return list(names)
+
+
+def warm():
+    """Загружает все шаблоны в кэш, возвращает их число."""
+    if not settings.TEMPLATE_CACHE:
+        return 0
+    engine = engines['django'].engine
+    loaded = 0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, UnicodeDecodeError) as error:
+            # Шаблоны чужих приложений могут требовать того, чего нет
+            # в проекте; их ошибка всплывёт при настоящей отрисовке.
+            logger.debug('Шаблон %s не прогрет: %s', name, error)
+        else:
+            loaded += 1
+    return loaded
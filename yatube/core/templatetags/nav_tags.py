@@ -0,0 +1,11 @@
+from django import template
+
+from core import nav
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def nav_menu(context):
+    match = getattr(context.get('request'), 'resolver_match', None)
+    return nav.menu(context.get('user'), match.view_name if match else None)
@@ -1,4 +1,52 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import nav, routers, tasks, template_cache
+from core.cache import get_or_compute
+from core.context_processors.year import year
+from core.management.commands.sync_replicas import copy_database
+from core.models import Task
+from core.signals import check_connections
+from posts.models import Follow, Post, TimelineEntry
+
+CLIENTS = 20
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise ValueError('сломалось')
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +54,395 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class GetOrComputeLoadTests(SimpleTestCase):
+    """Нагрузочная проверка: много клиентов разом просят остывший ключ."""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def slow_compute(self):
+        with self.calls_lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return 'index page'
+
+    def naive_get(self):
+        value = cache.get('hot')
+        if value is None:
+            value = self.slow_compute()
+            cache.set('hot', value, 60)
+        return value
+
+    def run_clients(self, fetch):
+        results = []
+        barrier = threading.Barrier(CLIENTS)
+
+        def client():
+            barrier.wait()
+            results.append(fetch())
+
+        threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def assert_single_recompute(self):
+        results = self.run_clients(
+            lambda: get_or_compute('hot', self.slow_compute, 60))
+        self.assertEqual(results, ['index page'] * CLIENTS)
+        self.assertEqual(self.calls, 1)
+
+    def test_naive_cache_has_dogpile(self):
+        self.run_clients(self.naive_get)
+        self.assertGreater(self.calls, 1)
+
+    def test_only_one_client_recomputes_locmem(self):
+        backend = 'django.core.cache.backends.locmem.LocMemCache'
+        with override_settings(CACHES={'default': {'BACKEND': backend}}):
+            self.assert_single_recompute()
+
+    def test_only_one_client_recomputes_file_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = 'core.cache_backends.FileBasedCache'
+        with override_settings(CACHES={
+            'default': {'BACKEND': backend, 'LOCATION': location}
+        }):
+            self.assert_single_recompute()
+
+    def test_expired_value_is_served_while_one_client_recomputes(self):
+        get_or_compute('hot', lambda: 'old page', 60)
+        entry = cache.get('hot')
+        cache.set('hot', (entry[0], entry[1], time.time() - 1), 60)
+        results = self.run_clients(
+            lambda: get_or_compute('hot', self.slow_compute, 60))
+        self.assertEqual(self.calls, 1)
+        self.assertIn('old page', results)
+        self.assertEqual(cache.get('hot')[0], 'index page')
+
+    def test_every_backend_option_can_be_created(self):
+        # Клиенты кэшей из CACHE_BACKENDS должны быть в requirements.txt.
+        for name, (backend, location) in settings.CACHE_BACKENDS.items():
+            with self.subTest(backend=name):
+                import_string(backend)(location, {})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Текст')
+
+    @override_settings(PERF_SAMPLE_RATE=1, PAGE_CACHE_TIMEOUT=0)
+    def test_sampled_request_is_measured(self):
+        with self.assertLogs('core.perf', 'INFO') as logs:
+            response = self.client.get('/')
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['cache_misses'], 1)
+
+        with self.assertLogs('core.perf', 'INFO') as logs:
+            self.client.get('/')
+        self.assertEqual(
+            json.loads(logs.records[0].getMessage())['cache_hits'], 1)
+
+    @override_settings(PERF_SAMPLE_RATE=1, PERF_SERVER_TIMING=False)
+    def test_header_can_be_turned_off(self):
+        with self.assertLogs('core.perf', 'INFO'):
+            response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_unusable_connection_is_closed_before_request(self):
+        connection.ensure_connection()
+        settings_dict = connection.settings_dict
+        is_usable = connection.is_usable
+        closed = []
+        settings_dict['CONN_HEALTH_CHECKS'] = True
+        connection.is_usable = lambda: False
+        connection.close = lambda: closed.append(True)
+        try:
+            check_connections()
+        finally:
+            del settings_dict['CONN_HEALTH_CHECKS']
+            connection.is_usable = is_usable
+            del connection.close
+        self.assertEqual(closed, [True])
+
+
+class ConcurrentWritersTests(SimpleTestCase):
+    """Писатели в файловой SQLite ждут друг друга, а не падают."""
+
+    WRITERS = 4
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.database = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory, 'db.sqlite3'),
+        )
+        self.database.pop('TEST', None)
+        with self.connect() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER)')
+
+    def connect(self):
+        wrapper = ConnectionHandler({'default': self.database})['default']
+        return wrapper.cursor()
+
+    def test_read_then_write_transactions_do_not_fail(self):
+        barrier = threading.Barrier(self.WRITERS)
+        errors = []
+
+        def writer():
+            wrapper = ConnectionHandler({'default': self.database})[
+                'default']
+            try:
+                barrier.wait()
+                with wrapper.cursor() as cursor:
+                    wrapper._start_transaction_under_autocommit()
+                    cursor.execute('SELECT COUNT(*) FROM counter')
+                    total = cursor.fetchone()[0]
+                    time.sleep(0.05)
+                    cursor.execute(
+                        'INSERT INTO counter VALUES (%s)', [total + 1])
+                    cursor.execute('COMMIT')
+            except Exception as error:
+                errors.append(error)
+            finally:
+                wrapper.close()
+
+        threads = [threading.Thread(target=writer)
+                   for _ in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with self.connect() as cursor:
+            cursor.execute('SELECT value FROM counter ORDER BY value')
+            values = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(values, list(range(1, self.WRITERS + 1)))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        """Запрос через ReplicaPinMiddleware: (база чтения, ответ)."""
+        used = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            used.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = routers.ReplicaPinMiddleware(view)(request)
+        return used[0], response
+
+    def test_reads_go_to_replica(self):
+        database, response = self.handle(self.factory.get('/'))
+        self.assertEqual(database, 'replica')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_writer_reads_own_writes(self):
+        database, response = self.handle(self.factory.get('/'), write=True)
+        self.assertEqual(database, 'default')
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        # Следующий запрос того же клиента тоже читает из основной базы.
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = '1'
+        self.assertEqual(self.handle(request)[0], 'default')
+        # Состояние не переходит к чужим запросам этого потока.
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_unsafe_methods_read_primary(self):
+        self.assertEqual(self.handle(self.factory.post('/'))[0], 'default')
+
+    def test_use_primary(self):
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_default(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with self.assertRaises(MiddlewareNotUsed):
+            routers.ReplicaPinMiddleware(HttpResponse)
+
+    def test_copy_sqlite_database(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        primary = os.path.join(directory, 'primary.sqlite3')
+        replica = os.path.join(directory, 'replica.sqlite3')
+        database = sqlite3.connect(primary)
+        database.execute('CREATE TABLE post (text TEXT)')
+        database.execute("INSERT INTO post VALUES ('Текст')")
+        database.commit()
+        database.close()
+        copy_database(primary, replica)
+        database = sqlite3.connect(replica)
+        self.addCleanup(database.close)
+        self.assertEqual(
+            database.execute('SELECT text FROM post').fetchall(),
+            [('Текст',)])
+
+
+class TemplateCacheTests(SimpleTestCase):
+    def test_warm_loads_every_template_once(self):
+        engine = engines['django'].engine
+        loader = engine.template_loaders[0]
+        loader.reset()
+        loaded = template_cache.warm()
+        names = template_cache.template_names(engine)
+        self.assertIn('posts/index.html', names)
+        self.assertIn('includes/nav.html', names)
+        self.assertEqual(loaded, len(names))
+        self.assertIn('posts/index.html', loader.get_template_cache)
+
+    @override_settings(TEMPLATE_CACHE=False)
+    def test_warm_is_skipped_without_cached_loader(self):
+        self.assertEqual(template_cache.warm(), 0)
+
+
+class NavTests(TestCase):
+    def setUp(self):
+        nav.warm()
+
+    def test_menu_marks_active_page(self):
+        response = self.client.get(reverse('about:author'))
+        self.assertContains(
+            response, 'nav-link active"\n           href="/about/author/"')
+        self.assertContains(response, reverse('users:login'))
+        self.assertContains(response, f'© {datetime.now().year}')
+
+    def test_user_name_is_added_to_shared_menu(self):
+        for username in ('anna', 'boris'):
+            user = User.objects.create_user(username=username)
+            self.client.force_login(user)
+            with self.subTest(username=username):
+                response = self.client.get(reverse('posts:post_create'))
+                self.assertContains(response, f'Пользователь: {username}')
+                self.assertContains(
+                    response, 'nav-link active"\n           href="/create/"')
+                # Меню нарисовано при прогреве, страница его не рисует.
+                self.assertTemplateNotUsed(response, nav.MENU_TEMPLATE)
+
+    def test_year_is_computed_once_per_request(self):
+        request = RequestFactory().get('/')
+        first = year(request)['year']
+        self.assertIs(year(request)['year'], first)
+        self.assertEqual(first, datetime.now().year)
+
+
+@override_settings(TASKS_EAGER=False, TASK_RETRY_DELAY=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_task_runs_once_and_is_deleted(self):
+        remember.delay('первый')
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.run_due(), (1, 0))
+        self.assertEqual(calls, ['первый'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        task = tasks.enqueue(explode)
+        self.assertEqual(tasks.run_due(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('сломалось', task.last_error)
+        # Повтор отложен, пока не пройдёт пауза.
+        self.assertEqual(tasks.run_due(), (0, 0))
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.run_due(), (0, 1))
+        task.refresh_from_db()
+        self.assertTrue(task.failed)
+        self.assertEqual(tasks.retry_failed(), 1)
+        self.assertEqual(len(tasks.claim(10)), 1)
+
+    def test_claimed_task_is_not_taken_twice_until_lease_expires(self):
+        remember.delay('один')
+        self.assertEqual(len(tasks.claim(10)), 1)
+        self.assertEqual(tasks.claim(10), [])
+        # Воркер упал, не закончив задачу.
+        Task.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tasks.run_due(), (1, 0))
+        self.assertEqual(calls, ['один'])
+
+    def test_side_effects_of_new_post_wait_for_worker(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        tasks.run_due()
+        post = Post.objects.create(author=author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(tasks.run_due(), (2, 0))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists())
+
+    def test_worker_command_drains_queue(self):
+        remember.delay('из команды')
+        out = StringIO()
+        call_command('run_tasks', '--burst', stdout=out)
+        self.assertEqual(calls, ['из команды'])
+        self.assertIn('Выполнено задач: 1, с ошибкой: 0', out.getvalue())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        self.assertIsNone(remember.delay('сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_failed_eager_task_is_left_for_worker(self):
+        task = tasks.enqueue(explode)
+        self.assertEqual(task.attempts, 1)
+        self.assertFalse(task.failed)
+        self.assertIn('сломалось', task.last_error)
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.run_due(), (0, 1))
+        task.refresh_from_db()
+        self.assertTrue(task.failed)
+
+    def test_post_is_not_saved_without_its_tasks(self):
+        author = User.objects.create_user(username='author')
+        with mock.patch.object(Task.objects, 'create',
+                               side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(author=author, text='Пост')
+        self.assertFalse(Post.objects.exists())
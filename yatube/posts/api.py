@@ -0,0 +1,210 @@
+"""JSON API для мобильного клиента: те же ленты, что и на сайте.
+
+Ответы собираются из словарей без шаблонов. Каждый ответ несёт ETag и
+Last-Modified: они считаются по дате самого нового поста ленты (поиск
+по индексу) и отметкам изменений из posts.freshness, поэтому на
+повторный запрос с If-None-Match или If-Modified-Since неизменившаяся
+лента отвечает 304, не читая сами посты.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from . import counters, freshness, scopes, timeline
+from .models import Group, Post
+from .paginator import paginate, paginate_comments
+
+User = get_user_model()
+
+API_VERSION = 1
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def post_data(post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': {
+            'username': post.author.username,
+            'full_name': post.author.get_full_name(),
+        },
+        'group': {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        } if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'thumbnail': post.thumbnail_url or None,
+        'comments_count': post.comments_count,
+        'url': reverse('posts:post_detail', args=[post.id]),
+    }
+
+
+def page_data(request, page_obj):
+    def link(cursor):
+        if cursor is None:
+            return None
+        return request.build_absolute_uri(f'{request.path}?cursor={cursor}')
+
+    return {
+        'results': [post_data(post) for post in page_obj],
+        'previous': link(page_obj.previous_cursor),
+        'next': link(page_obj.next_cursor),
+    }
+
+
+def conditional_json(request, newest, changed_scopes, build):
+    """JSON-ответ build() или 304, если клиент уже видел эту версию.
+
+    newest — дата самого нового поста ленты, changed_scopes — области
+    posts.scopes, изменения в которых меняют ответ.
+    """
+    stamps = freshness.changed_at(scopes.EPOCH, *changed_scopes)
+    if newest is not None:
+        stamps.append(newest.timestamp())
+    last_modified = int(max(stamps))
+    user_id = request.user.id if request.user.is_authenticated else ''
+    etag = quote_etag(hashlib.sha1(
+        f'{API_VERSION}|{request.get_full_path()}|{user_id}|'
+        f'{newest}|{stamps}'.encode()
+    ).hexdigest())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build(), json_dumps_params=JSON_PARAMS)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def newest_pub_date(posts, field='pub_date'):
+    return posts.aggregate(newest=Max(field))['newest']
+
+
+@require_GET
+def index(request):
+    return conditional_json(
+        request,
+        newest_pub_date(Post.objects.all()),
+        [scopes.ALL_POSTS],
+        lambda: page_data(request, paginate(request, Post.objects.for_feed())),
+    )
+
+
+@require_GET
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+
+    def build():
+        data = page_data(request, paginate(request, group.posts.for_feed()))
+        data['group'] = {
+            'slug': group.slug,
+            'title': group.title,
+            'description': group.description,
+        }
+        return data
+
+    return conditional_json(
+        request,
+        newest_pub_date(group.posts.all()),
+        [scopes.group_posts_scope(group.id)],
+        build,
+    )
+
+
+@require_GET
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    posts = Post.objects.filter(author_id=author.id)
+
+    def build():
+        stats = counters.get_stats(author)
+        data = page_data(request, paginate(request, posts.for_feed()))
+        data['author'] = {
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+            'following_count': stats.following_count,
+        }
+        return data
+
+    return conditional_json(
+        request,
+        newest_pub_date(posts),
+        [scopes.user_posts_scope(author.id),
+         scopes.user_follows_scope(author.id)],
+        build,
+    )
+
+
+def comments_data(request, post, cursor=None):
+    comments = paginate_comments(post, cursor)
+    next_url = None
+    if comments.next_cursor:
+        next_url = request.build_absolute_uri(
+            reverse('api_v1:post_comments', args=[post.id])
+            + f'?cursor={comments.next_cursor}')
+    return {
+        'results': [
+            {
+                'id': comment.id,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+                'author': comment.author.username,
+            }
+            for comment in comments
+        ],
+        'next': next_url,
+    }
+
+
+@require_GET
+def post_detail(request, post_id):
+    newest = get_object_or_404(
+        Post.objects.values_list('pub_date', flat=True), id=post_id)
+
+    def build():
+        post = Post.objects.select_related('author', 'group').get(id=post_id)
+        data = post_data(post)
+        data['comments'] = comments_data(request, post)
+        return data
+
+    return conditional_json(
+        request, newest, [scopes.post_scope(post_id)], build)
+
+
+@require_GET
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id', 'pub_date'), id=post_id)
+    return conditional_json(
+        request,
+        post.pub_date,
+        [scopes.post_scope(post_id)],
+        lambda: comments_data(request, post, request.GET.get('cursor')),
+    )
+
+
+@require_GET
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Нужно войти.'}, status=401,
+            json_dumps_params=JSON_PARAMS)
+    posts = timeline.feed_for(request.user)
+    return conditional_json(
+        request,
+        newest_pub_date(posts, 'feed_date'),
+        [scopes.ALL_POSTS, scopes.follow_scope(request.user.id)],
+        lambda: page_data(request, paginate(
+            request, posts.for_feed(), key_field='feed_date')),
+    )
@@ -0,0 +1,228 @@
+"""Замеры страниц из posts/urls.py через тестовый клиент Django.
+
+Каждый адрес запрашивается несколько раз: по этим запросам считаются
+перцентили времени ответа. Ещё один запрос идёт под
+CaptureQueriesContext и tracemalloc — он даёт число SQL-запросов и пик
+памяти Python. Всё выполняется в транзакции, которая откатывается,
+поэтому страницы вроде profile_follow не меняют базу.
+
+render_times() отдельно замеряет только отрисовку шаблонов каждой
+страницы — с кэширующим загрузчиком и без него.
+"""
+import copy
+import math
+import platform
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.conf import settings
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import perf
+
+from . import urls
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def sample_arguments(reader=None):
+    """Значения параметров адресов, на которых страницы тяжелее всего.
+
+    Автор выбирается не равным reader, чтобы тот мог на него подписаться.
+    """
+    arguments = {}
+    author = Follow.objects.exclude(author=reader).values(
+        'author__username').annotate(total=Count('id')).order_by(
+        '-total').first()
+    if author is None:
+        author = Post.objects.exclude(author=reader).values(
+            'author__username').first()
+    if author is not None:
+        arguments['username'] = author['author__username']
+    group = Post.objects.exclude(group=None).values('group').annotate(
+        total=Count('id')).order_by('-total').values_list(
+        'group__slug', flat=True).first()
+    if group is None:
+        group = Group.objects.values_list('slug', flat=True).first()
+    if group is not None:
+        arguments['slug'] = group
+    post = Comment.objects.values('post_id').annotate(
+        total=Count('id')).order_by('-total').first()
+    post_id = post['post_id'] if post else Post.objects.values_list(
+        'id', flat=True).first()
+    if post_id is not None:
+        arguments['post_id'] = post_id
+    return arguments
+
+
+def reader():
+    """Пользователь с самой длинной лентой подписок."""
+    follow = Follow.objects.values('user').annotate(
+        total=Count('id')).order_by('-total').first()
+    if follow is not None:
+        return User.objects.get(id=follow['user'])
+    return User.objects.order_by('id').first()
+
+
+def targets(arguments):
+    """(имя, путь) для каждого адреса posts/urls.py по порядку."""
+    for pattern in urls.urlpatterns:
+        names = pattern.pattern.converters.keys()
+        if not set(names) <= arguments.keys():
+            continue
+        kwargs = {name: arguments[name] for name in names}
+        yield pattern.name, reverse(f'{urls.app_name}:{pattern.name}',
+                                    kwargs=kwargs)
+
+
+def measure(client, path, requests, warmup, cold):
+    # Код ответа — по первому запросу: повторы profile_unfollow уже
+    # получают 404, ведь подписку снял первый из них.
+    status = None
+    for _ in range(warmup):
+        status = status or client.get(path).status_code
+    timings = []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        status = status or response.status_code
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'path': path,
+        'status': status,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(requests=30, warmup=3, cold=False):
+    """Замеряет все адреса и возвращает отчёт, готовый для json.dump."""
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests': requests,
+            'warmup': warmup,
+            'cold_cache': cold,
+        },
+        'data': {
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count(),
+        },
+        'urls': {},
+    }
+    user = reader()
+    arguments = sample_arguments(user)
+    with transaction.atomic():
+        for anonymous in (True, False):
+            client = Client()
+            if not anonymous:
+                if user is None:
+                    break
+                client.force_login(user)
+            for name, path in targets(arguments):
+                key = name if anonymous else f'{name} (вход)'
+                report['urls'][key] = measure(
+                    client, path, requests, warmup, cold)
+        transaction.set_rollback(True)
+    return report
+
+
+def _templates(cached):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    loaders = settings.TEMPLATE_SOURCE_LOADERS
+    templates[0]['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', loaders)]
+        if cached else loaders
+    )
+    return templates
+
+
+def render_times(requests=30):
+    """Время отрисовки шаблонов каждой страницы, мс.
+
+    Для каждой страницы и загрузчика ('cached', 'uncached') — первая
+    отрисовка после старта без прогрева (first_ms) и перцентили
+    остальных. Кэш страниц выключен: иначе анонимные страницы не
+    рисуются вовсе. Страницы-перенаправления пропускаются.
+    """
+    perf.instrument_templates()
+    user = reader()
+    arguments = sample_arguments(user)
+    report = {}
+    with transaction.atomic(), override_settings(PAGE_CACHE_TIMEOUT=0):
+        for loader in ('cached', 'uncached'):
+            with override_settings(TEMPLATES=_templates(loader == 'cached')):
+                for anonymous in (True, False):
+                    client = Client()
+                    if not anonymous:
+                        if user is None:
+                            break
+                        client.force_login(user)
+                    for name, path in targets(arguments):
+                        timings = []
+                        for _ in range(requests + 1):
+                            with perf.measure() as stats:
+                                response = client.get(path)
+                            if response.status_code != 200:
+                                break
+                            timings.append(stats.template_time * 1000)
+                        if not timings:
+                            continue
+                        key = name if anonymous else f'{name} (вход)'
+                        report.setdefault(key, {})[loader] = {
+                            'first_ms': round(timings[0], 2),
+                            'p50_ms': round(percentile(timings[1:], 50), 2),
+                            'p95_ms': round(percentile(timings[1:], 95), 2),
+                        }
+        transaction.set_rollback(True)
+    return report
+
+
+def compare(report, baseline):
+    """Строки сравнения p95 и числа запросов с прошлым отчётом."""
+    lines = []
+    for name, result in report['urls'].items():
+        before = baseline.get('urls', {}).get(name)
+        if before is None:
+            lines.append(f'{name}: нет в прошлом отчёте')
+            continue
+        ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 0
+        lines.append(
+            f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} ms '
+            f'(x{ratio:.2f}), запросов {before["queries"]} -> '
+            f'{result["queries"]}')
+    return lines
@@ -0,0 +1,289 @@
+"""Потоковый импорт и экспорт групп, постов, комментариев и подписок.
+
+Строки читаются и пишутся по одной (JSONL или CSV), а в базу уходят
+пачками через bulk_create, каждая пачка — в своей транзакции, так что
+память не растёт с размером файла. Пользователи и группы ссылаются по
+username и slug, посты и комментарии сохраняют свои id. Сигналы при
+bulk_create не срабатывают, поэтому счётчики, ленты подписок и
+поисковый индекс обновляются после каждой пачки или, с defer, один раз
+в конце (finalize).
+"""
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from core import page_cache
+
+from . import counters, freshness, graph, scopes, search, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+FORMATS = ('jsonl', 'csv')
+
+
+class BulkImportError(Exception):
+    pass
+
+
+# Поле в файле и путь к нему в values_list() при экспорте.
+EXPORT_FIELDS = {
+    'groups': (('id', 'id'), ('title', 'title'), ('slug', 'slug'),
+               ('description', 'description')),
+    'posts': (('id', 'id'), ('text', 'text'), ('pub_date', 'pub_date'),
+              ('author', 'author__username'), ('group', 'group__slug'),
+              ('image', 'image')),
+    'comments': (('id', 'id'), ('post', 'post_id'),
+                 ('author', 'author__username'), ('text', 'text'),
+                 ('created', 'created')),
+    'follows': (('user', 'user__username'), ('author', 'author__username')),
+}
+MODELS = {
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+KINDS = tuple(EXPORT_FIELDS)
+
+
+def fields(kind):
+    return [name for name, _ in EXPORT_FIELDS[kind]]
+
+
+def export_rows(kind, chunk_size=2000):
+    """Строки для выгрузки по возрастанию id, без загрузки всей таблицы."""
+    names = fields(kind)
+    lookups = [lookup for _, lookup in EXPORT_FIELDS[kind]]
+    rows = MODELS[kind].objects.order_by('id').values_list(*lookups)
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield {
+            name: value.isoformat() if hasattr(value, 'isoformat') else value
+            for name, value in zip(names, values)
+        }
+
+
+def write_rows(rows, stream, fmt, kind):
+    """Пишет строки в поток, возвращает их число."""
+    written = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=fields(kind))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        return written
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+def read_rows(stream, fmt, skip=0):
+    """Строки из потока; первые skip строк пропускаются без разбора."""
+    if fmt == 'csv':
+        rows = csv.DictReader(stream)
+        for row in islice(rows, skip, None):
+            yield {key: value or None for key, value in row.items()}
+        return
+    lines = (line for line in stream if line.strip())
+    for line in islice(lines, skip, None):
+        yield json.loads(line)
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def original_timestamps(model):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из файла."""
+    changed = []
+    for field in model._meta.concrete_fields:
+        for flag in ('auto_now', 'auto_now_add'):
+            if getattr(field, flag, False):
+                setattr(field, flag, False)
+                changed.append((field, flag))
+    try:
+        yield
+    finally:
+        for field, flag in changed:
+            setattr(field, flag, True)
+
+
+def _user_ids(usernames):
+    """id пользователей по username; недостающие создаются без пароля."""
+    usernames = set(usernames)
+    ids = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'id'))
+    missing = usernames - ids.keys()
+    if missing:
+        User.objects.bulk_create(
+            [User(username=username, password=make_password(None))
+             for username in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(User.objects.filter(
+            username__in=missing).values_list('username', 'id'))
+    return ids
+
+
+def _group_ids(slugs):
+    slugs = {slug for slug in slugs if slug}
+    ids = dict(Group.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+    missing = slugs - ids.keys()
+    if missing:
+        raise BulkImportError(
+            f'Нет групп {", ".join(sorted(missing))}: загрузите их раньше.')
+    return ids
+
+
+def _date(value):
+    date = parse_datetime(value) if value else None
+    if date is None:
+        raise BulkImportError(f'Неверная дата: {value!r}.')
+    return date
+
+
+def _build_groups(rows):
+    return [Group(id=int(row['id']), title=row['title'], slug=row['slug'],
+                  description=row['description'] or '') for row in rows]
+
+
+def _build_posts(rows):
+    users = _user_ids(row['author'] for row in rows)
+    groups = _group_ids(row.get('group') for row in rows)
+    posts = []
+    for row in rows:
+        pub_date = _date(row['pub_date'])
+        posts.append(Post(
+            id=int(row['id']),
+            text=row['text'],
+            pub_date=pub_date,
+            updated=pub_date,
+            author_id=users[row['author']],
+            group_id=groups.get(row.get('group')),
+            image=row.get('image') or '',
+        ))
+    return posts
+
+
+def _build_comments(rows):
+    users = _user_ids(row['author'] for row in rows)
+    post_ids = {int(row['post']) for row in rows}
+    missing = post_ids - set(Post.objects.filter(
+        id__in=post_ids).values_list('id', flat=True))
+    if missing:
+        raise BulkImportError(
+            f'Нет постов {sorted(missing)}: загрузите их раньше.')
+    return [Comment(id=int(row['id']), post_id=int(row['post']),
+                    author_id=users[row['author']], text=row['text'],
+                    created=_date(row['created'])) for row in rows]
+
+
+def _build_follows(rows):
+    users = _user_ids(
+        username for row in rows for username in (row['user'], row['author']))
+    return [Follow(user_id=users[row['user']], author_id=users[row['author']])
+            for row in rows if row['user'] != row['author']]
+
+
+BUILDERS = {
+    'groups': _build_groups,
+    'posts': _build_posts,
+    'comments': _build_comments,
+    'follows': _build_follows,
+}
+
+
+def maintain(kind, objects):
+    """Обновляет производные данные для только что загруженной пачки."""
+    if kind == 'posts':
+        authors = {post.author_id for post in objects}
+        counters.reconcile_users(User.objects.filter(id__in=authors))
+        index = search.get_index()
+        # Перечитываем из базы: пост с занятым id мог не загрузиться.
+        saved = Post.objects.filter(
+            id__in=[post.id for post in objects]).only(
+            'text', 'author', 'pub_date')
+        for post in saved:
+            index.add(post.id, post.text)
+            timeline.fan_out(post)
+    elif kind == 'comments':
+        counters.reconcile_comments(
+            Post.objects.filter(id__in={c.post_id for c in objects}))
+    elif kind == 'follows':
+        users = {f.user_id for f in objects} | {f.author_id for f in objects}
+        counters.reconcile_users(User.objects.filter(id__in=users))
+        for follow in objects:
+            timeline.backfill(follow.user_id, follow.author_id)
+        followers = {follow.user_id for follow in objects}
+        graph.invalidate(followers)
+        graph.mark_stale(followers)
+    freshness.touch(scopes.EPOCH)
+    page_cache.purge(page_cache.ALL)
+
+
+def finalize(kinds):
+    """Отложенное обслуживание после загрузки: пересчёт всего разом."""
+    kinds = set(kinds)
+    if kinds & {'posts', 'follows'}:
+        counters.reconcile_users()
+        timeline.rebuild()
+    if 'follows' in kinds:
+        graph.invalidate(Follow.objects.values_list(
+            'user_id', flat=True).distinct().iterator())
+        UserStats.objects.update(suggestions_stale=True)
+    if 'posts' in kinds:
+        search.rebuild()
+    if kinds & {'posts', 'comments'}:
+        counters.reconcile_comments()
+    freshness.touch(scopes.EPOCH)
+    page_cache.purge(page_cache.ALL)
+
+
+def reset_sequences(kind):
+    """После вставки явных id сдвигает автоинкремент (для PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [MODELS[kind]])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def import_rows(kind, rows, batch_size=1000, defer=False, done=0,
+                progress=None):
+    """Загружает строки пачками, возвращает общее число обработанных.
+
+    done — сколько строк файла уже загружено прошлыми запусками, оно
+    передаётся в progress(done) после каждой закоммиченной пачки.
+    Повтор пачки после сбоя безопасен: конфликты по id и уникальным
+    ключам пропускаются.
+    """
+    model = MODELS[kind]
+    for batch in _batches(rows, batch_size):
+        with transaction.atomic():
+            objects = BUILDERS[kind](batch)
+            with original_timestamps(model):
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+            if not defer:
+                maintain(kind, objects)
+        done += len(batch)
+        if progress is not None:
+            progress(done)
+    reset_sequences(kind)
+    return done
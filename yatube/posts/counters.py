@@ -0,0 +1,76 @@
+"""Денормализованные счётчики постов, комментариев и подписок."""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user_counter(user_id, field, delta):
+    # Пропавшую строку счётчиков создаст get_stats при чтении.
+    _change(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def change_comments_count(post_id, delta):
+    _change(Post.objects.filter(id=post_id), 'comments_count', delta)
+
+
+def get_stats(user):
+    """Счётчики пользователя; строка создаётся, если её ещё нет."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile_users(User.objects.filter(id=user.id))
+        return UserStats.objects.get(user_id=user.id)
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('id'))
+        .values('total')
+    ), 0)
+
+
+USER_COUNTERS = {
+    'posts_count': (Post.objects.all(), 'author'),
+    'followers_count': (Follow.objects.all(), 'author'),
+    'following_count': (Follow.objects.all(), 'user'),
+}
+
+
+def reconcile_users(users=None):
+    """Пересчитывает счётчики пользователей, возвращает число исправлений."""
+    users = User.objects.all() if users is None else users
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in
+         users.filter(stats__isnull=True).values_list('id', flat=True)],
+        ignore_conflicts=True,
+    )
+    fixed = 0
+    for field, (queryset, owner) in USER_COUNTERS.items():
+        # OuterRef('pk') у UserStats и есть id пользователя.
+        actual = _count(queryset, owner)
+        drifted = UserStats.objects.filter(user__in=users).annotate(
+            actual=actual).exclude(**{field: F('actual')})
+        fixed += UserStats.objects.filter(
+            pk__in=drifted.values('pk')).update(**{field: actual})
+    return fixed
+
+
+def reconcile_comments(posts=None):
+    """Пересчитывает Post.comments_count, возвращает число исправлений."""
+    posts = Post.objects.all() if posts is None else posts
+    actual = _count(Comment.objects.all(), 'post')
+    drifted = posts.annotate(actual=actual).exclude(
+        comments_count=F('actual'))
+    return Post.objects.filter(
+        pk__in=drifted.values('pk')).update(comments_count=actual)
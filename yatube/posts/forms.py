@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from . import uploads
 from .models import Post, Comment
 
 
@@ -15,6 +18,37 @@ class PostForm(forms.ModelForm):
                       ('Выберете группу, '
                        'в которой будет отображаться этот пост.'), }
 
+    def __init__(self, *args, oversized=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_error = None
+        key = self.add_prefix('image')
+        if key in oversized:
+            # Приём файла прервал uploads.BoundedUploadHandler.
+            self.image_error = uploads.too_large_error()
+        elif key in self.files:
+            try:
+                uploads.check_limits(self.files[key])
+            except forms.ValidationError as error:
+                # Файл вне лимитов не отдаём Pillow на проверку.
+                self.image_error = error
+                self.files = self.files.copy()
+                del self.files[key]
+
+    def clean(self):
+        if self.image_error:
+            self.add_error('image', self.image_error)
+        return super().clean()
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.instance.image_hash = ''
+        elif isinstance(image, UploadedFile):
+            image, self.instance.image_hash = uploads.process(image)
+            # Такая картинка уже лежит на диске: пост ссылается на неё.
+            image = uploads.find_duplicate(self.instance.image_hash) or image
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
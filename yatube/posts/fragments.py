@@ -0,0 +1,79 @@
+"""Кэш отрисованных карточек постов (includes/fragment.html).
+
+Ключ карточки содержит id поста, время его изменения и версии автора и
+группы. Правка поста меняет время изменения, а сохранение автора или
+группы поднимает их версию (см. posts.signals), поэтому старые карточки
+просто перестают запрашиваться и устаревших данных лента не показывает.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core import perf
+from core.cache import get_many_or_add, new_version
+
+FRAGMENT_TEMPLATE = 'includes/fragment.html'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def cache_stats():
+    """Попадания и промахи кэша карточек в этом процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _version_key(kind, object_id):
+    return f'fragment_version:{kind}:{object_id}'
+
+
+def bump_version(kind, object_id):
+    cache.set(_version_key(kind, object_id), new_version(), None)
+
+
+def _versions(kind, ids):
+    keys = {_version_key(kind, object_id): object_id for object_id in ids}
+    versions = get_many_or_add(list(keys))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def fragment_key(post, author_versions, group_versions):
+    return 'post_fragment:{}:{}:{}:{}'.format(
+        post.id,
+        post.updated.timestamp(),
+        author_versions[post.author_id],
+        group_versions.get(post.group_id, ''),
+    )
+
+
+def render_fragments(posts):
+    """HTML карточек постов: из кэша, а отсутствующие рисуются заново."""
+    posts = list(posts)
+    author_versions = _versions('user', {post.author_id for post in posts})
+    group_versions = _versions(
+        'group', {post.group_id for post in posts if post.group_id})
+    keys = [fragment_key(post, author_versions, group_versions)
+            for post in posts]
+    cached = cache.get_many(keys)
+    rendered = {}
+    fragments = []
+    template = None
+    for post, key in zip(posts, keys):
+        html = cached.get(key)
+        if html is None:
+            # Шаблон ищется один раз на ленту, а не на каждую карточку.
+            template = template or get_template(FRAGMENT_TEMPLATE)
+            html = template.render({'post': post})
+            rendered[key] = html
+        fragments.append(mark_safe(html))
+    if rendered:
+        cache.set_many(rendered, settings.POST_FRAGMENT_CACHE_TIMEOUT)
+    with _stats_lock:
+        _stats['hits'] += len(posts) - len(rendered)
+        _stats['misses'] += len(rendered)
+    perf.count_cache(hits=len(posts) - len(rendered), misses=len(rendered))
+    return fragments
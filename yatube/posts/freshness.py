@@ -0,0 +1,40 @@
+"""Время последнего изменения лент для условных GET-запросов API.
+
+Для каждой области из posts.scopes — всех постов, группы, автора,
+поста, подписок пользователя — в кэше хранится момент последнего
+изменения. Сигналы из posts.signals обновляют его при сохранении и
+удалении постов, комментариев и подписок. Область EPOCH меняется при
+правке пользователей и групп: их имена есть в любой ленте.
+"""
+import time
+
+from django.core.cache import cache
+
+from core.cache import get_many_or_add
+
+from .scopes import post_scopes
+
+
+def _key(scope):
+    return f'changed_at:{scope}'
+
+
+def touch(*scopes):
+    now = time.time()
+    cache.set_many({_key(scope): now for scope in scopes}, None)
+
+
+def touch_post(post_id, author_id, group_id=None):
+    """Отмечает изменение поста во всех лентах, где он показан."""
+    touch(*post_scopes(post_id, author_id, group_id))
+
+
+def changed_at(*scopes):
+    """Время последнего изменения по областям, в секундах Unix.
+
+    Если отметка вытеснилась из кэша, изменение считается случившимся
+    сейчас: лишний ответ 200 безопаснее устаревшего 304.
+    """
+    keys = [_key(scope) for scope in scopes]
+    found = get_many_or_add(keys, time.time)
+    return [found[key] for key in keys]
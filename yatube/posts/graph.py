@@ -0,0 +1,140 @@
+"""Граф подписок: статус подписки, списки подписчиков и рекомендации.
+
+Авторы, на которых подписан пользователь, читаются одним запросом и
+кэшируются по пользователю, поэтому статус подписки для любого числа
+авторов на странице обходится без запросов к базе. Подписка и отписка
+сбрасывают этот кэш (posts.signals).
+
+Рекомендации «возможно, вы знакомы» — друзья друзей: авторы, на которых
+подписаны те, на кого подписан пользователь, по числу таких друзей.
+Их пересчитывает команда compute_suggestions пачками и только для
+пользователей с пометкой UserStats.suggestions_stale. Пометку ставит
+подписка или отписка самого пользователя или того, на кого он подписан.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Follow, FollowSuggestion, UserStats
+
+
+def _following_key(user_id):
+    return f'follow_graph:following:{user_id}'
+
+
+def following_ids(user):
+    """frozenset id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = _following_key(user.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(user_id=user.id).values_list(
+            'author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+    return ids
+
+
+def follow_status(user, author_ids):
+    """Те из author_ids, на кого подписан пользователь."""
+    return following_ids(user).intersection(author_ids)
+
+
+def is_following(user, author):
+    return author.id in following_ids(user)
+
+
+def invalidate(user_ids):
+    cache.delete_many([_following_key(user_id) for user_id in user_ids])
+
+
+def mark_stale(user_ids):
+    """Помечает устаревшими рекомендации user_ids и их подписчиков."""
+    user_ids = list(user_ids)
+    followers = Follow.objects.filter(
+        author_id__in=user_ids).values('user_id')
+    UserStats.objects.filter(
+        Q(user_id__in=user_ids) | Q(user_id__in=followers),
+        suggestions_stale=False,
+    ).update(suggestions_stale=True)
+
+
+def followers_of(user):
+    """Подписки на пользователя, новые первыми; подписчик — follow.user."""
+    return Follow.objects.filter(author=user).select_related(
+        'user').order_by('-id')
+
+
+def following_of(user):
+    """Подписки пользователя, новые первыми; автор — follow.author."""
+    return Follow.objects.filter(user=user).select_related(
+        'author').order_by('-id')
+
+
+def suggestions(user, limit):
+    """Рекомендации пользователю без тех, на кого он уже подписался."""
+    if not user.is_authenticated:
+        return []
+    return list(
+        FollowSuggestion.objects.filter(user=user)
+        .exclude(candidate__following__user=user)
+        .select_related('candidate')[:limit]
+    )
+
+
+def compute(user_ids, limit=None):
+    """Пересчитывает рекомендации пользователей, возвращает их число."""
+    limit = limit or settings.FOLLOW_SUGGESTIONS_COUNT
+    with transaction.atomic():
+        # Пометку снимаем до чтения графа: подписка, сделанная во время
+        # пересчёта, поставит её снова.
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            suggestions_stale=False)
+        following = {}
+        for user_id, author_id in Follow.objects.filter(
+                user_id__in=user_ids).values_list('user_id', 'author_id'):
+            following.setdefault(user_id, set()).add(author_id)
+        # Подписки друзей (f2) с подписками пользователей на этих
+        # друзей (f1): (пользователь, кандидат, сколько друзей за него).
+        friends_follows = (
+            Follow.objects.filter(user__following__user_id__in=user_ids)
+            .values_list('user__following__user_id', 'author_id')
+            .annotate(score=Count('id')).order_by()
+        )
+        candidates = {}
+        for user_id, candidate_id, score in friends_follows.iterator():
+            if (candidate_id == user_id
+                    or candidate_id in following.get(user_id, ())):
+                continue
+            # При равном счёте раньше идут давние пользователи.
+            candidates.setdefault(user_id, []).append((score, -candidate_id))
+        rows = [
+            FollowSuggestion(user_id=user_id, candidate_id=-candidate_id,
+                             score=score)
+            for user_id, scored in candidates.items()
+            for score, candidate_id in heapq.nlargest(limit, scored)
+        ]
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(rows)
+    return len(rows)
+
+
+def compute_stale(batch_size=500, limit=None):
+    """Пересчитывает рекомендации всех помеченных пользователей пачками.
+
+    Возвращает (пользователей, рекомендаций).
+    """
+    users = suggestions_count = 0
+    while True:
+        user_ids = list(
+            UserStats.objects.filter(suggestions_stale=True)
+            .order_by('user_id').values_list('user_id', flat=True)
+            [:batch_size]
+        )
+        if not user_ids:
+            return users, suggestions_count
+        suggestions_count += compute(user_ids, limit)
+        users += len(user_ids)
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время отрисовки шаблонов каждой страницы posts с '
+            'кэширующим загрузчиком шаблонов и без него: первую отрисовку '
+            'после старта и p50/p95 остальных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=30,
+            help='Сколько замеряемых отрисовок на страницу.')
+        parser.add_argument(
+            '--output', '-o',
+            help='Сохранить отчёт в JSON-файл.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше нуля.')
+        report = benchmark.render_times(requests=options['requests'])
+        for name, loaders in report.items():
+            self.stdout.write(name)
+            for loader, result in loaders.items():
+                self.stdout.write(
+                    f'  {loader:9} первая {result["first_ms"]:8.2f}  '
+                    f'p50 {result["p50_ms"]:8.2f}  '
+                    f'p95 {result["p95_ms"]:8.2f} ms')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчёт сохранён в {options["output"]}.'))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа (p50/p95/p99), число SQL-запросов и пик '
+            'памяти для каждой страницы posts, анонимно и под читателем с '
+            'самой длинной лентой. Данные можно создать через seed_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=30,
+            help='Сколько замеряемых запросов на страницу.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument(
+            '--output', '-o',
+            help='Сохранить отчёт в JSON-файл.')
+        parser.add_argument(
+            '--compare',
+            help='Сравнить с прошлым отчётом из JSON-файла.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше нуля.')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+        report = benchmark.run(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            cold=options['cold'],
+        )
+        for name, result in report['urls'].items():
+            self.stdout.write(
+                f'{name:28} {result["status"]} '
+                f'p50 {result["p50_ms"]:8.2f} p95 {result["p95_ms"]:8.2f} '
+                f'p99 {result["p99_ms"]:8.2f} ms  '
+                f'{result["queries"]:3} запросов  '
+                f'{result["peak_memory_kb"]:8.1f} КБ')
+        if baseline is not None:
+            self.stdout.write(self.style.MIGRATE_HEADING('Сравнение'))
+            for line in benchmark.compare(report, baseline):
+                self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчёт сохранён в {options["output"]}.'))
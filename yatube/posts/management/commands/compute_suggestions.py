@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import graph
+from posts.models import UserStats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «возможно, вы знакомы» (друзья '
+            'друзей) для пользователей, чьи подписки или подписки их '
+            'друзей изменились. Удобно запускать по расписанию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать рекомендации всех пользователей.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            UserStats.objects.update(suggestions_stale=True)
+        users, suggestions = graph.compute_stale(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}, рекомендаций: '
+            f'{suggestions}.'))
@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts import seeding, timeline
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+PAGE_SIZE = 10
+
+
+def timed(queryset):
+    started = time.perf_counter()
+    list(queryset.all())
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Показывает план и время запросов лент на текущей базе. '
+            'Удобно запускать до и после миграции posts 0009.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Сначала создать столько постов (и авторов, групп, '
+                 'подписок, комментариев к ним).')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз выполнить каждый запрос; берётся лучшее время.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seeding.seed(users=max(options['seed'] // 100, 10),
+                         posts=options['seed'], images=0,
+                         log=self.stdout.write)
+        for name, queryset in self.feed_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            best = min(timed(queryset) for _ in range(options['repeat']))
+            self.stdout.write(f'{best * 1000:.2f} ms\n')
+
+    def feed_queries(self):
+        post = Post.objects.order_by('id').last()
+        if post is None:
+            self.stderr.write('В базе нет постов, запустите с --seed.')
+            return
+        middle = Post.objects.filter(id__lte=post.id // 2).order_by(
+            '-id').first() or post
+        deeper = CursorPaginator(Post.objects.all(), PAGE_SIZE).after(
+            middle.pub_date, middle.id, 'lt')
+        feed = Post.objects.for_feed().order_by('-pub_date', '-id')
+        author = Post.objects.filter(id=middle.id).values_list(
+            'author_id', flat=True)[0]
+        group = Group.objects.order_by('id').first()
+        reader = Follow.objects.values('user').annotate(
+            total=Count('id')).order_by('-total').first()
+        commented = Comment.objects.order_by('-id').values_list(
+            'post_id', flat=True).first()
+
+        yield 'index: первая страница', feed[:PAGE_SIZE + 1]
+        yield 'index: середина ленты по курсору', (
+            feed.filter(deeper)[:PAGE_SIZE + 1])
+        offset = Post.objects.filter(deeper).count()
+        yield 'index: середина ленты через OFFSET', (
+            feed[offset:offset + PAGE_SIZE])
+        yield 'profile', feed.filter(author_id=author)[:PAGE_SIZE + 1]
+        if group is not None:
+            yield 'group_posts', feed.filter(group=group)[:PAGE_SIZE + 1]
+        if reader is not None:
+            user = User(id=reader['user'])
+            yield 'follow_index', timeline.feed_for(user).for_feed().order_by(
+                '-feed_date', '-id')[:PAGE_SIZE + 1]
+            yield 'profile: проверка подписки', Follow.objects.filter(
+                user=user, author_id=author)[:1]
+        if commented is not None:
+            yield 'post_detail: комментарии', Comment.objects.filter(
+                post_id=commented).order_by('created')
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии или подписки в JSONL или '
+            'CSV, читая базу порциями. Файлы картинок не копируются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.KINDS)
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='Файл для выгрузки; по умолчанию stdout.')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='Формат; по умолчанию по расширению файла, иначе jsonl.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        rows = bulk.export_rows(options['kind'], options['chunk_size'])
+        if path == '-':
+            bulk.write_rows(rows, sys.stdout, fmt, options['kind'])
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            written = bulk.write_rows(rows, stream, fmt, options['kind'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {written}.'))
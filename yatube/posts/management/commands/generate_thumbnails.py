@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Готовит варианты картинки для постов, у которых их ещё '
+            'нет.')
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            Q(thumbnail_url='') | Q(image_srcset='')
+        ).values_list('id', flat=True)
+        done = 0
+        for post_id in pending.iterator():
+            if thumbnails.generate(post_id):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Готово превью: {done}.'))
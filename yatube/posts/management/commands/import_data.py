@@ -0,0 +1,84 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии или подписки из JSONL или '
+            'CSV пачками. Прерванную загрузку можно продолжить тем же '
+            'запуском: прогресс хранится в файле <файл>.progress.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.KINDS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='Формат; по умолчанию по расширению файла, иначе jsonl.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Строк в одной транзакции.')
+        parser.add_argument(
+            '--defer-maintenance', action='store_true',
+            help='Пересчитать счётчики, ленты и поиск один раз в конце, '
+                 'а не после каждой пачки.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с начала файла, забыв сохранённый прогресс.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        kind = options['kind']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        state_path = f'{path}.progress'
+        done = 0 if options['restart'] else self.load_state(state_path, kind)
+        if done:
+            self.stdout.write(f'Продолжаем после строки {done}.')
+
+        def progress(done):
+            self.save_state(state_path, kind, done)
+            self.stdout.write(f'Загружено строк: {done}.')
+
+        try:
+            with open(path, encoding='utf-8', newline='') as stream:
+                done = bulk.import_rows(
+                    kind,
+                    bulk.read_rows(stream, fmt, skip=done),
+                    batch_size=options['batch_size'],
+                    defer=options['defer_maintenance'],
+                    done=done,
+                    progress=progress,
+                )
+        except (bulk.BulkImportError, KeyError, ValueError) as error:
+            done = self.load_state(state_path, kind)
+            raise CommandError(
+                f'Ошибка в пачке после строки {done}: {error!r}. Исправьте '
+                'файл и запустите команду снова, загрузка продолжится.')
+        if options['defer_maintenance']:
+            self.stdout.write('Пересчитываем счётчики, ленты и поиск...')
+            bulk.finalize([kind])
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        self.stdout.write(self.style.SUCCESS(f'Готово, строк: {done}.'))
+
+    def load_state(self, state_path, kind):
+        try:
+            with open(state_path, encoding='utf-8') as stream:
+                state = json.load(stream)
+        except FileNotFoundError:
+            return 0
+        if state.get('kind') != kind:
+            raise CommandError(
+                f'{state_path} относится к загрузке {state.get("kind")}; '
+                'запустите с --restart.')
+        return state['done']
+
+    def save_state(self, state_path, kind, done):
+        # Сначала во временный файл: прогресс не потеряется при сбое записи.
+        temporary = f'{state_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump({'kind': kind, 'done': done}, stream)
+        os.replace(temporary, state_path)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу правдоподобными данными для замеров: '
+            'активность авторов, подписки и комментарии распределены по '
+            'степенному закону, тексты — Faker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.')
+        parser.add_argument(
+            '--comments', type=int,
+            help='Сколько комментариев; по умолчанию столько же, сколько '
+                 'постов.')
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок сохранить в MEDIA_ROOT.')
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до сегодня разбросать даты постов.')
+        parser.add_argument(
+            '--seed', type=int,
+            help='Зерно генератора для воспроизводимых данных.')
+        parser.add_argument(
+            '--no-maintenance', action='store_true',
+            help='Не пересчитывать счётчики, ленты подписок и поиск.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        if not 0 <= options['image_ratio'] <= 1:
+            raise CommandError('--image-ratio должен быть от 0 до 1.')
+        counts = seeding.seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            images=options['images'],
+            image_ratio=options['image_ratio'],
+            days=options['days'],
+            random_seed=options['seed'],
+            maintain=not options['no_maintenance'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{kind}: {total}' for kind, total in counts.items())))
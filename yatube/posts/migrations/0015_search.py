@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:05
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+from posts.stemmer import terms
+
+FTS_TABLE = 'posts_post_search'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    fts = False
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING '
+                "fts5(terms, tokenize = 'unicode61 remove_diacritics 0')")
+            fts = settings.SEARCH_BACKEND != 'python'
+        except OperationalError:
+            # SQLite собран без FTS5: поиск будет через SearchEntry.
+            pass
+    Post = apps.get_model('posts', 'Post')
+    SearchEntry = apps.get_model('posts', 'SearchEntry')
+    posts = Post.objects.values_list('id', 'text').iterator()
+    with connection.cursor() as cursor:
+        for post_id, text in posts:
+            words = terms(text)
+            if fts:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                    [post_id, ' '.join(words)])
+                continue
+            counts = {}
+            for word in words:
+                counts[word[:64]] = counts.get(word[:64], 0) + 1
+            SearchEntry.objects.bulk_create(
+                SearchEntry(post_id=post_id, term=term, count=count)
+                for term, count in counts.items())
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('count', models.PositiveSmallIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['term', 'post'], name='search_term_post'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
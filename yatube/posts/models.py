@@ -1,12 +1,34 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
 
 User = get_user_model()
 
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'updated',
+    'image',
+    'thumbnail_url',
+    'image_srcset',
+    'comments_count',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним запросом, без лишних полей."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
 
 class Post(models.Model):
     text = models.TextField(help_text='Введите текст поста')
     pub_date = models.DateTimeField("date published", auto_now_add=True)
+    updated = models.DateTimeField('date updated', auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts', verbose_name='Автор')
     group = models.ForeignKey("Group", on_delete=models.SET_NULL,
@@ -18,13 +40,36 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail_url = models.CharField(max_length=255, blank=True,
+                                     editable=False)
+    image_srcset = models.TextField(blank=True, editable=False)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                  db_index=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta():
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Задачи из сигнала post_save (core.tasks) пишутся в той же
+        # транзакции, что и сам пост.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -49,6 +94,12 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta():
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created'),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -66,7 +117,136 @@ class Follow(models.Model):
     )
 
     class Meta():
-        models.UniqueConstraint(
-            fields=['user', 'author'],
-            name='following_unique'
-        )
+        # Уникальный индекс (user, author) заодно ускоряет проверку
+        # подписки в профиле и выборку подписок пользователя.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='following_unique'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='following_not_self'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись готовой ленты подписок: пост автора, на которого подписан user.
+
+    Заполняется при публикации поста (fan-out on write), поэтому
+    лента подписок читается одним диапазоном по индексу (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta():
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='timeline_user_pub_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, чтобы страницы не считали их COUNT(*).
+
+    Поддерживаются сигналами из posts.signals, расхождения исправляет
+    команда reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0, db_index=True)
+    following_count = models.PositiveIntegerField(default=0)
+    # Посты автора читаются при открытии ленты, а не раскладываются
+    # (posts.timeline).
+    timeline_pulled = models.BooleanField(default=False, db_index=True)
+    # Подписки друзей изменились: рекомендации нужно пересчитать.
+    suggestions_stale = models.BooleanField(default=True, db_index=True)
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class FollowSuggestion(models.Model):
+    """Кандидат в подписки: на него подписаны score друзей пользователя.
+
+    Заполняется командой compute_suggestions, см. posts.graph.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField()
+
+    class Meta():
+        ordering = ['-score', 'id']
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='suggestion_user_score'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'candidate'],
+                name='suggestion_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.candidate_id}'
+
+
+class SearchEntry(models.Model):
+    """Обратный индекс поиска для баз без FTS5: основа слова и пост.
+
+    Поддерживается сигналами из posts.signals, см. posts.search.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_entries'
+    )
+    count = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_post'),
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,23 @@
+"""Кэш страниц постов (core.page_cache) по областям из posts.scopes.
+
+Вьюхи отмечают, из чего собрана страница, а сигналы из posts.signals
+сбрасывают только изменившиеся области.
+"""
+from core import page_cache
+
+from .scopes import group_scope, post_scopes, user_scope
+
+
+def tag_feed(request, posts, *scopes):
+    """Отмечает ленту: её области и авторов и группы её карточек."""
+    cards = set()
+    for post in posts:
+        cards.add(user_scope(post.author_id))
+        if post.group_id:
+            cards.add(group_scope(post.group_id))
+    page_cache.tag(request, *scopes, *cards)
+
+
+def purge_post(post_id, author_id, group_id=None):
+    """Сбрасывает страницу поста и ленты, где он показан."""
+    page_cache.purge(*post_scopes(post_id, author_id, group_id))
@@ -0,0 +1,261 @@
+import json
+from math import ceil
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+PAGE_LINKS_ON_EACH_SIDE = 2
+PAGE_LINKS_ON_ENDS = 1
+# Дальше старые ссылки ?page=N не листают: OFFSET стал бы огромным.
+MAX_OFFSET_PAGE = 10000
+
+
+class CursorPaginator(Paginator):
+    """Листает ленту курсором по ключу (дата, id) вместо OFFSET.
+
+    Страница выбирается условием по ключу последней показанной записи,
+    поэтому не нужен ни COUNT(*), ни OFFSET, и любая страница стоит
+    столько же, сколько первая. По умолчанию лента идёт от новых записей
+    к старым, с descending=False — от старых к новым.
+    """
+
+    def __init__(self, object_list, per_page, key_field='pub_date',
+                 descending=True, **kwargs):
+        self.key_field = key_field
+        self.descending = descending
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задаёт сам пагинатор, см. ordered().
+        pass
+
+    def encode_cursor(self, obj, direction):
+        key = getattr(obj, self.key_field)
+        raw = f'{direction}|{key.isoformat()}|{obj.pk}'
+        return urlsafe_base64_encode(force_bytes(raw))
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, дата, id) или None для плохого курсора."""
+        try:
+            direction, key, pk = force_str(
+                urlsafe_base64_decode(cursor)).split('|')
+            key = parse_datetime(key)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return None
+        if direction not in (NEXT, PREVIOUS) or key is None:
+            return None
+        return direction, key, pk
+
+    def ordered(self, descending=None):
+        if descending is None:
+            descending = self.descending
+        sign = '-' if descending else ''
+        return self.object_list.order_by(
+            f'{sign}{self.key_field}', f'{sign}id')
+
+    def after(self, key, pk, lookup):
+        """Условие «строго после (key, pk)» в направлении lookup.
+
+        Записано как key <= k AND (key < k OR id < pk), а не через
+        одно OR: так база идёт по индексу на key и останавливается
+        после LIMIT, а не сортирует всю оставшуюся ленту.
+        """
+        field = self.key_field
+        return (
+            Q(**{f'{field}__{lookup}e': key})
+            & (Q(**{f'{field}__{lookup}': key}) | Q(**{f'id__{lookup}': pk}))
+        )
+
+    def get_cursor_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._build_page(self.ordered(), 1, has_previous=False)
+        direction, key, pk = position
+        forward, backward = ('lt', 'gt') if self.descending else ('gt', 'lt')
+        if direction == NEXT:
+            return self._build_page(
+                self.ordered().filter(self.after(key, pk, forward)),
+                None, has_previous=True)
+        before = self.after(key, pk, backward)
+        rows = list(
+            self.ordered(not self.descending).filter(before)
+            [:self.per_page + 1]
+        )
+        if len(rows) <= self.per_page:
+            # Дошли до начала ленты: отдаём полную первую страницу,
+            # даже если с тех пор появились новые записи.
+            return self._build_page(self.ordered(), 1, has_previous=False)
+        rows = rows[:self.per_page][::-1]
+        return self._make_page(rows, None, True, True)
+
+    def get_offset_page(self, number):
+        """Старые ссылки вида ?page=N: OFFSET без подсчёта всех записей."""
+        try:
+            number = min(max(int(number), 1), MAX_OFFSET_PAGE)
+        except (TypeError, ValueError):
+            number = 1
+        page = self._offset_page(number)
+        if page.object_list or number == 1:
+            return page
+        # Страницы нет: как Paginator.get_page, отдаём последнюю.
+        return self._offset_page(
+            max(ceil(self.ordered().count() / self.per_page), 1))
+
+    def _offset_page(self, number):
+        offset = (number - 1) * self.per_page
+        return self._build_page(
+            self.ordered()[offset:], number, has_previous=number > 1)
+
+    def _build_page(self, queryset, number, has_previous):
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return self._make_page(
+            rows[:self.per_page], number, has_previous, has_next)
+
+    def _make_page(self, rows, number, has_previous, has_next):
+        page = Page(rows, number, self)
+        page.previous_cursor = (
+            self.encode_cursor(rows[0], PREVIOUS)
+            if has_previous and rows else None
+        )
+        page.next_cursor = (
+            self.encode_cursor(rows[-1], NEXT) if has_next else None
+        )
+        return page
+
+
+def estimate_count(queryset):
+    """Оценка числа строк запроса планировщиком PostgreSQL или None."""
+    if not isinstance(queryset, QuerySet):
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class ApproximatePaginator(Paginator):
+    """Листает по номерам страниц без точного COUNT(*) по большой таблице.
+
+    Число записей передаётся готовым (count, например из счётчиков
+    UserStats) или оценивается планировщиком PostgreSQL. Точный COUNT
+    выполняется, только если оценки нет или она меньше
+    PAGINATOR_EXACT_COUNT_LIMIT. Страница читает на одну запись больше и
+    по ней уточняет число: за концом списка нет ссылки на пустую
+    страницу, а страницы дальше заниженной оценки не теряются. Ссылки на
+    страницы (page.links) — окно вокруг текущей и края списка, а не весь
+    page_range.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.PAGINATOR_EXACT_COUNT_LIMIT:
+            return self._exact_count()
+        return estimate
+
+    def _exact_count(self):
+        return Paginator.count.func(self)
+
+    def _set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        # Верхнюю границу проверяет page() по самим записям: число
+        # записей может быть неточным.
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы — не целое число')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На странице нет записей')
+        if len(rows) > self.per_page:
+            self._set_count(max(self.count, bottom + len(rows)))
+        else:
+            self._set_count(bottom + len(rows))
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.links = self.page_links(number)
+        return page
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            self._set_count(self._exact_count())
+            return self.page(self.num_pages)
+
+    def page_links(self, number):
+        """Номера страниц для ссылок; None — пропуск между ними."""
+        last = self.num_pages
+        shown = sorted({
+            *range(1, min(PAGE_LINKS_ON_ENDS, last) + 1),
+            *range(max(1, number - PAGE_LINKS_ON_EACH_SIDE),
+                   min(last, number + PAGE_LINKS_ON_EACH_SIDE) + 1),
+            *range(max(1, last - PAGE_LINKS_ON_ENDS + 1), last + 1),
+        })
+        links = []
+        previous = 0
+        for page_number in shown:
+            if page_number - previous == 2:
+                links.append(previous + 1)
+            elif page_number - previous > 2:
+                links.append(None)
+            links.append(page_number)
+            previous = page_number
+        return links
+
+
+def paginate(request, object_list, key_field='pub_date'):
+    """Страница ленты по параметрам запроса ?cursor= или ?page=."""
+    paginator = CursorPaginator(
+        object_list, settings.POST_PAGING_COUNT, key_field=key_field)
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    if cursor is None and page_number is not None:
+        return paginator.get_offset_page(page_number)
+    return paginator.get_cursor_page(cursor)
+
+
+def paginate_comments(post, cursor=None):
+    """Страница комментариев поста, от старых к новым."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENT_PAGING_COUNT,
+        key_field='created',
+        descending=False,
+    )
+    return paginator.get_cursor_page(cursor)
@@ -0,0 +1,55 @@
+"""Области данных постов: общие имена для кэша страниц и отметок изменений.
+
+Область называет часть данных, от которой зависит ответ. Кэш страниц
+(posts.pages) сбрасывает по ней страницы, а posts.freshness хранит для
+неё время последнего изменения для условных GET-запросов API:
+
+- 'posts' — лента всех постов;
+- 'post:<id>' — текст, картинка и комментарии поста;
+- 'user:<id>', 'group:<id>' — имя автора, название и описание группы,
+  они видны в карточках постов любой ленты;
+- 'user_posts:<id>', 'group_posts:<id>' — посты автора (и их число на
+  профиле и странице поста), посты группы;
+- 'user_follows:<id>' — счётчики подписчиков и подписок на профиле;
+- 'follow:<id>' — лента подписок пользователя;
+- 'epoch' — любые имена авторов и групп, для ответов, которые не
+  перечисляют их по отдельности.
+"""
+ALL_POSTS = 'posts'
+EPOCH = 'epoch'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def user_posts_scope(user_id):
+    return f'user_posts:{user_id}'
+
+
+def group_posts_scope(group_id):
+    return f'group_posts:{group_id}'
+
+
+def user_follows_scope(user_id):
+    return f'user_follows:{user_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scopes(post_id, author_id, group_id=None):
+    """Области, которые меняет правка поста: он сам и ленты с ним."""
+    scopes = [ALL_POSTS, post_scope(post_id), user_posts_scope(author_id)]
+    if group_id:
+        scopes.append(group_posts_scope(group_id))
+    return scopes
@@ -0,0 +1,234 @@
+"""Полнотекстовый поиск по тексту постов.
+
+Текст разбивается на слова и приводится к основам (posts.stemmer), так
+что «посты» находятся по запросу «постами». Основы хранятся в обратном
+индексе: в SQLite с FTS5 это виртуальная таблица posts_post_search с
+ранжированием bm25, в остальных базах — модель SearchEntry, где
+пересечение по словам запроса и релевантность (TF-IDF) считает сама
+база, а в Python приходит только страница id. Индекс обновляет задача
+sync_post, которую сигналы ставят в очередь при сохранении и удалении
+поста; собрать его заново можно командой rebuild_search_index.
+"""
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (Case, Count, F, FloatField, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Ln
+
+from core import tasks
+from core.cache import get_or_compute
+
+from .models import Post, SearchEntry
+from .stemmer import terms
+
+FTS_TABLE = 'posts_post_search'
+MAX_TERMS = 10
+TERM_LENGTH = 64
+# Число постов для IDF: неточность в пределах срока на ранжирование
+# почти не влияет.
+DOCUMENT_COUNT_KEY = 'search:document_count'
+DOCUMENT_COUNT_TIMEOUT = 60 * 10
+
+_fts_tables = {}
+
+
+def fts_available(connection):
+    """Есть ли в базе таблица FTS5 (её создаёт миграция, если может)."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names())
+    return _fts_tables[name]
+
+
+def document(text):
+    """Строка основ для FTS5: своего русского стеммера у неё нет."""
+    return ' '.join(terms(text))
+
+
+class Fts5Index:
+    def add(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                [post_id, document(text)])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def _match(self, query_terms):
+        return ' '.join(f'"{term}"' for term in query_terms)
+
+    def count(self, query_terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self._match(query_terms)])
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query_terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [self._match(query_terms), limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonIndex:
+    def __init__(self):
+        self._weights = {}
+
+    def add(self, post_id, text):
+        SearchEntry.objects.filter(post_id=post_id).delete()
+        SearchEntry.objects.bulk_create(
+            SearchEntry(post_id=post_id, term=term[:TERM_LENGTH], count=count)
+            for term, count in Counter(terms(text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchEntry.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchEntry.objects.all().delete()
+
+    def _idf(self, query_terms):
+        """IDF слов запроса или None, если какого-то слова нет в индексе."""
+        key = tuple(query_terms)
+        if key not in self._weights:
+            frequencies = dict(
+                SearchEntry.objects.filter(term__in=query_terms)
+                .values_list('term').annotate(posts=Count('post_id'))
+                .order_by())
+            total = get_or_compute(
+                DOCUMENT_COUNT_KEY, Post.objects.count,
+                DOCUMENT_COUNT_TIMEOUT)
+            self._weights[key] = None
+            if len(frequencies) == len(query_terms):
+                self._weights[key] = {
+                    term: math.log(1 + max(total, posts) / posts)
+                    for term, posts in frequencies.items()
+                }
+        return self._weights[key]
+
+    def _matches(self, query_terms):
+        """Посты со всеми словами запроса с их TF-IDF, в одном запросе."""
+        idf = self._idf(query_terms)
+        if idf is None:
+            return None
+        weight = Case(
+            *(When(term=term, then=Value(value))
+              for term, value in idf.items()),
+            output_field=FloatField(),
+        )
+        tf = Value(1.0) + Ln(Cast('count', FloatField()))
+        return (
+            SearchEntry.objects.filter(term__in=query_terms)
+            .values('post_id')
+            .annotate(
+                matched=Count('term', distinct=True),
+                score=Sum(tf * weight, output_field=FloatField()),
+            )
+            .filter(matched=len(query_terms))
+        )
+
+    def count(self, query_terms):
+        matches = self._matches(query_terms)
+        return 0 if matches is None else matches.count()
+
+    def ranked_ids(self, query_terms, offset, limit):
+        matches = self._matches(query_terms)
+        if matches is None:
+            return []
+        ranked = matches.order_by(F('score').desc(), F('post_id').desc())
+        return list(ranked.values_list('post_id', flat=True)
+                    [offset:offset + limit])
+
+
+def get_index():
+    if settings.SEARCH_BACKEND == 'python':
+        return PythonIndex()
+    if settings.SEARCH_BACKEND == 'fts5' or fts_available(connection):
+        return Fts5Index()
+    return PythonIndex()
+
+
+def index_post(post):
+    get_index().add(post.id, post.text)
+
+
+def remove_post(post_id):
+    get_index().remove(post_id)
+
+
+@tasks.task
+def sync_post(post_id):
+    """Приводит запись индекса к текущему тексту поста."""
+    text = Post.objects.filter(id=post_id).values_list(
+        'text', flat=True).first()
+    if text is None:
+        remove_post(post_id)
+    else:
+        get_index().add(post_id, text)
+
+
+def rebuild(batch_size=1000):
+    """Собирает индекс заново, возвращает число проиндексированных постов."""
+    index = get_index()
+    index.clear()
+    indexed = 0
+    for post_id, text in Post.objects.values_list('id', 'text').iterator(
+            chunk_size=batch_size):
+        index.add(post_id, text)
+        indexed += 1
+    return indexed
+
+
+class SearchResults:
+    """Найденные посты по убыванию релевантности.
+
+    Считает и достаёт только нужный срез, поэтому подходит для
+    Paginator: страница — это один запрос к индексу и один к постам.
+    """
+
+    def __init__(self, query):
+        self.terms = list(dict.fromkeys(
+            term[:TERM_LENGTH] for term in terms(query)))[:MAX_TERMS]
+        self.index = get_index()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.index.count(self.terms) if self.terms else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if not self.terms:
+            return []
+        offset = item.start or 0
+        ids = self.index.ranked_ids(
+            self.terms, offset, (item.stop or self.count()) - offset)
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def search(query):
+    return SearchResults(query)
@@ -0,0 +1,192 @@
+"""Генератор правдоподобных данных для замеров производительности.
+
+Активность авторов, популярность у подписчиков и обсуждаемость постов
+распределены по степенному закону: несколько «звёзд» пишут и
+собирают подписчиков больше, чем тысячи остальных, а большинство
+постов почти без комментариев. Тексты и имена даёт Faker (через mixer,
+как в тестах), строки пишутся пачками через bulk_create, а счётчики,
+ленты и поиск пересчитываются в конце, как при импорте (posts.bulk).
+"""
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from . import bulk
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+IMAGE_SIZE = (1200, 800)
+# Параметр Парето для числа подписок пользователя: среднее a / (a - 1).
+FOLLOWS_SHAPE = 1.5
+
+
+def power_law_index(size):
+    """Случайный индекс от 0 до size - 1 с вероятностью ~ 1 / (индекс + 1).
+
+    Логарифмически равномерная величина: не нужен список весов, поэтому
+    выбор из миллиона постов не занимает памяти.
+    """
+    return min(int(size ** random.random()) - 1, size - 1)
+
+
+def _insert(model, objects):
+    with bulk.original_timestamps(model):
+        # Размер пачки для INSERT выбирает бэкенд: SQLite ограничивает
+        # число параметров и частей составного SELECT.
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+
+
+def _batched(total):
+    for start in range(0, total, BATCH_SIZE):
+        yield range(start, min(start + BATCH_SIZE, total))
+
+
+def seed_users(mixer, prefix, total):
+    password = make_password(None)
+    for numbers in _batched(total):
+        _insert(User, [
+            User(username=f'{prefix}_{number}',
+                 first_name=mixer.faker.first_name(),
+                 last_name=mixer.faker.last_name(),
+                 password=password)
+            for number in numbers
+        ])
+    # Порядок id — это ранг: первые пользователи самые активные.
+    return list(User.objects.filter(username__startswith=f'{prefix}_')
+                .order_by('id').values_list('id', flat=True))
+
+
+def seed_groups(mixer, prefix, total):
+    _insert(Group, [
+        mixer.blend(Group, slug=f'{prefix}-{number}')
+        for number in range(total)
+    ])
+    return list(Group.objects.filter(slug__startswith=f'{prefix}-')
+                .order_by('id').values_list('id', flat=True))
+
+
+def seed_images(prefix, total):
+    """Сохраняет total картинок; посты ссылаются на них повторно."""
+    names = []
+    for number in range(total):
+        buffer = BytesIO()
+        color = tuple(random.randrange(256) for _ in range(3))
+        Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG', quality=80)
+        names.append(default_storage.save(
+            f'posts/{prefix}_{number}.jpg', ContentFile(buffer.getvalue())))
+    return names
+
+
+def seed_posts(mixer, total, authors, groups, images, image_ratio, days):
+    now = timezone.now()
+    for numbers in _batched(total):
+        posts = []
+        for _ in numbers:
+            pub_date = now - timedelta(seconds=random.random() * days * 86400)
+            has_group = groups and random.random() < 0.7
+            has_image = images and random.random() < image_ratio
+            posts.append(Post(
+                text=mixer.faker.paragraph(nb_sentences=random.randint(1, 6)),
+                author_id=authors[power_law_index(len(authors))],
+                group_id=(groups[power_law_index(len(groups))]
+                          if has_group else None),
+                image=random.choice(images) if has_image else '',
+                pub_date=pub_date,
+                updated=pub_date,
+            ))
+        _insert(Post, posts)
+
+
+def seed_follows(users, mean):
+    """У каждого пользователя ~mean подписок, чаще на популярных авторов."""
+    follows = []
+    total = 0
+    for user_id in users:
+        wanted = int(random.paretovariate(FOLLOWS_SHAPE)
+                     * mean * (FOLLOWS_SHAPE - 1) / FOLLOWS_SHAPE)
+        authors = {users[power_law_index(len(users))]
+                   for _ in range(min(wanted, len(users) - 1))}
+        authors.discard(user_id)
+        follows.extend(Follow(user_id=user_id, author_id=author_id)
+                       for author_id in authors)
+        if len(follows) >= BATCH_SIZE:
+            _insert(Follow, follows)
+            total += len(follows)
+            follows = []
+    _insert(Follow, follows)
+    return total + len(follows)
+
+
+def seed_comments(mixer, total, users, posts):
+    """Комментарии по степенному закону: обсуждают немногие посты."""
+    for numbers in _batched(total):
+        comments = []
+        for _ in numbers:
+            post_id, pub_date = posts[power_law_index(len(posts))]
+            created = pub_date + timedelta(
+                seconds=random.random() * 3 * 86400)
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=users[power_law_index(len(users))],
+                text=mixer.faker.sentence(),
+                created=min(created, timezone.now()),
+            ))
+        _insert(Comment, comments)
+
+
+def seed(users=1000, posts=10000, groups=20, follows=20, comments=None,
+         images=10, image_ratio=0.2, days=365, random_seed=None,
+         maintain=True, log=None):
+    """Заполняет базу и возвращает число созданных записей по видам.
+
+    comments по умолчанию — столько же, сколько постов. С maintain=False
+    счётчики, ленты подписок и поисковый индекс не пересчитываются.
+    """
+    log = log or (lambda message: None)
+    random.seed(random_seed)
+    mixer = Mixer(commit=False, locale='ru')
+    if random_seed is not None:
+        mixer.faker.seed_instance(random_seed)
+    prefix = f'seed{int(time.time())}'
+    comments = posts if comments is None else comments
+
+    user_ids = seed_users(mixer, prefix, users)
+    log(f'Пользователей: {len(user_ids)}')
+    group_ids = seed_groups(mixer, prefix, groups)
+    image_names = seed_images(prefix, images)
+    seed_posts(mixer, posts, user_ids, group_ids, image_names, image_ratio,
+               days)
+    log(f'Постов: {posts}')
+    follows_count = seed_follows(user_ids, follows)
+    log(f'Подписок: {follows_count}')
+    post_dates = list(Post.objects.filter(
+        author__username__startswith=f'{prefix}_').values_list(
+        'id', 'pub_date'))
+    if post_dates and user_ids:
+        seed_comments(mixer, comments, user_ids, post_dates)
+    log(f'Комментариев: {comments}')
+    if maintain:
+        log('Пересчитываем счётчики, ленты и поиск...')
+        # Одна транзакция вместо фиксации каждой пачки INSERT.
+        with transaction.atomic():
+            bulk.finalize(['posts', 'comments', 'follows'])
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': posts,
+        'follows': follows_count,
+        'comments': comments if post_dates else 0,
+        'images': len(image_names),
+    }
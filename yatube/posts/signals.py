@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import page_cache, tasks
+
+from . import (counters, fragments, freshness, graph, pages, scopes,
+               search, timeline)
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        fragments.bump_version('user', instance.id)
+        freshness.touch(scopes.EPOCH)
+        page_cache.purge(scopes.user_scope(instance.id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    fragments.bump_version('group', instance.id)
+    freshness.touch(scopes.EPOCH)
+    page_cache.purge(scopes.group_scope(instance.id))
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, **kwargs):
+    # Пост могли перенести в другую группу: старая лента тоже изменилась.
+    if instance._state.adding or instance.pk is None:
+        return
+    old_group_id = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', flat=True).first()
+    if old_group_id and old_group_id != instance.group_id:
+        freshness.touch(scopes.group_posts_scope(old_group_id))
+        page_cache.purge(scopes.group_posts_scope(old_group_id))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        tasks.enqueue(timeline.fan_out_post, instance.id)
+    if update_fields is None or 'text' in update_fields:
+        tasks.enqueue(search.sync_post, instance.id)
+    freshness.touch_post(instance.id, instance.author_id, instance.group_id)
+    pages.purge_post(instance.id, instance.author_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    tasks.enqueue(search.sync_post, instance.id)
+    freshness.touch_post(instance.id, instance.author_id, instance.group_id)
+    pages.purge_post(instance.id, instance.author_id, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+        _touch_commented_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    _touch_commented_post(instance)
+
+
+def _touch_commented_post(comment):
+    post = Post.objects.filter(id=comment.post_id).values(
+        'author_id', 'group_id').first()
+    if post is not None:
+        freshness.touch_post(comment.post_id, **post)
+    # Комментарии видны только на странице самого поста.
+    page_cache.purge(scopes.post_scope(comment.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        tasks.enqueue(timeline.sync_follow, instance.user_id,
+                      instance.author_id)
+        freshness.touch(scopes.follow_scope(instance.user_id))
+        graph.invalidate([instance.user_id])
+        graph.mark_stale([instance.user_id])
+        _follow_counters_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    tasks.enqueue(timeline.sync_follow, instance.user_id,
+                  instance.author_id)
+    freshness.touch(scopes.follow_scope(instance.user_id))
+    graph.invalidate([instance.user_id])
+    graph.mark_stale([instance.user_id])
+    _follow_counters_changed(instance)
+
+
+def _follow_counters_changed(follow):
+    # Счётчики подписок видны и на странице профиля, и в его API.
+    changed = (scopes.user_follows_scope(follow.user_id),
+               scopes.user_follows_scope(follow.author_id))
+    freshness.touch(*changed)
+    page_cache.purge(*changed)
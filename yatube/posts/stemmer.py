@@ -0,0 +1,65 @@
+"""Стеммер русского языка по алгоритму Портера (Snowball).
+
+Слова без русских гласных, например латиница и числа, возвращаются
+как есть, только в нижнем регистре.
+"""
+import re
+
+WORD = re.compile(r'\w+')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+# Окончание «ость» снимается, только если оно целиком лежит в R2.
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+DOUBLE_N = re.compile(r'нн$')
+FINAL_I = re.compile(r'и$')
+SOFT_SIGN = re.compile(r'ь$')
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    rv, found = PERFECTIVE_GERUND.subn('', rv, 1)
+    if not found:
+        rv = REFLEXIVE.sub('', rv, 1)
+        rv, found = ADJECTIVE.subn('', rv, 1)
+        if found:
+            rv = PARTICIPLE.sub('', rv, 1)
+        else:
+            rv, found = VERB.subn('', rv, 1)
+            if not found:
+                rv = NOUN.sub('', rv, 1)
+    rv = FINAL_I.sub('', rv, 1)
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_SUFFIX.sub('', rv, 1)
+    rv, found = DOUBLE_N.subn('н', rv, 1)
+    if not found:
+        rv, found = SUPERLATIVE.subn('', rv, 1)
+        if found:
+            rv = DOUBLE_N.sub('н', rv, 1)
+        else:
+            rv = SOFT_SIGN.sub('', rv, 1)
+    return start + rv
+
+
+def terms(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word) for word in WORD.findall(text)]
@@ -0,0 +1,26 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def follow_button(context, person, followed):
+    """Кнопка подписки на person для строки списка людей.
+
+    Тег, а не {% include %} в цикле: на строку не нужны ни поиск
+    шаблона, ни новый уровень контекста.
+    """
+    user = context['user']
+    if not user.is_authenticated or user == person:
+        return ''
+    if followed:
+        return format_html(
+            '<a class="btn btn-sm btn-light" href="{}" role="button">'
+            'Отписаться</a>',
+            reverse('posts:profile_unfollow', args=[person.username]))
+    return format_html(
+        '<a class="btn btn-sm btn-primary" href="{}" role="button">'
+        'Подписаться</a>',
+        reverse('posts:profile_follow', args=[person.username]))
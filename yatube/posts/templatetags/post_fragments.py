@@ -0,0 +1,34 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from posts import thumbnails
+from posts.fragments import render_fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_fragments(posts):
+    return render_fragments(posts)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Картинка поста с вариантами разных ширин и форматов."""
+    if not post.image:
+        return ''
+    if not post.thumbnail_url:
+        return format_html(
+            '<img class="card-img my-2" src="{}">', post.image.url)
+    jpeg_srcset, sources = thumbnails.picture_sources(post)
+    return format_html(
+        '<picture>{}<img class="card-img my-2" src="{}" srcset="{}" '
+        'sizes="{}"></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((mime, srcset, thumbnails.SIZES) for mime, srcset in sources)
+        ),
+        post.thumbnail_url,
+        jpeg_srcset,
+        thumbnails.SIZES,
+    )
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='HasNoName', first_name='Имя', last_name='Фамилия')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {number}')
+            for number in range(12))
+        cls.post = Post.objects.latest('pub_date')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_index_serializes_feed_page(self):
+        response = self.client.get(reverse('api_v1:index'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.id,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': {'username': 'HasNoName', 'full_name': 'Имя Фамилия'},
+            'group': {'slug': 'test-slug', 'title': 'Тестовая группа'},
+            'image': None,
+            'thumbnail': None,
+            'comments_count': 0,
+            'url': reverse('posts:post_detail', args=[self.post.id]),
+        })
+        self.assertIsNone(data['previous'])
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual(len(next_page['results']), 2)
+
+    def test_unchanged_feed_answers_not_modified(self):
+        # На 304 читается только дата новейшего поста и группа или автор.
+        urls = {
+            reverse('api_v1:index'): 1,
+            reverse('api_v1:group_list', args=['test-slug']): 2,
+            reverse('api_v1:profile', args=['HasNoName']): 2,
+            reverse('api_v1:post_detail', args=[self.post.id]): 1,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_produce_new_etag(self):
+        detail = reverse('api_v1:post_detail', args=[self.post.id])
+        group = reverse('api_v1:group_list', args=['test-slug'])
+        etags = {url: self.client.get(url)['ETag'] for url in (detail, group)}
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 1)
+
+    def test_profile_etag_tracks_follow_counters(self):
+        author = reverse('api_v1:profile', args=['HasNoName'])
+        follower = reverse('api_v1:profile', args=['reader'])
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (author, follower)}
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        for url, field in ((author, 'followers_count'),
+                           (follower, 'following_count')):
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['author'][field], 1)
+                etags[url] = response['ETag']
+        follow.delete()
+        response = self.client.get(
+            follower, HTTP_IF_NONE_MATCH=etags[follower])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['following_count'], 0)
+
+    def test_follow_feed_requires_login_and_tracks_follows(self):
+        url = reverse('api_v1:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class BulkDataTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Запись {number}',
+                                group=self.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def export(self, fmt):
+        for kind in ('groups', 'posts', 'comments', 'follows'):
+            call_command('export_data', kind,
+                         output=self.path(f'{kind}.{fmt}'), stdout=StringIO())
+
+    def load(self, fmt, **options):
+        for kind in ('groups', 'posts', 'comments', 'follows'):
+            call_command('import_data', kind, self.path(f'{kind}.{fmt}'),
+                         batch_size=2, stdout=StringIO(), **options)
+
+    def wipe(self):
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        search.rebuild()
+
+    def assert_restored(self):
+        author = User.objects.get(username='author')
+        reader = User.objects.get(username='reader')
+        for original in self.posts:
+            post = Post.objects.get(id=original.id)
+            self.assertEqual(post.text, original.text)
+            self.assertEqual(post.pub_date, original.pub_date)
+            self.assertEqual(post.author, author)
+            self.assertEqual(post.group_id is not None,
+                             original.group_id is not None)
+        self.assertEqual(Post.objects.get(id=self.posts[0].id).comments_count,
+                         1)
+        self.assertEqual(author.stats.posts_count, 5)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(reader.stats.following_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 5)
+        self.assertEqual(len(search.search('запись')[:10]), 5)
+
+    def test_round_trip_jsonl(self):
+        self.export('jsonl')
+        self.wipe()
+        self.load('jsonl')
+        self.assert_restored()
+
+    def test_round_trip_csv_with_deferred_maintenance(self):
+        self.export('csv')
+        self.wipe()
+        self.load('csv', defer_maintenance=True)
+        self.assert_restored()
+
+    def test_import_resumes_from_saved_progress(self):
+        self.export('jsonl')
+        self.wipe()
+        call_command('import_data', 'groups', self.path('groups.jsonl'),
+                     stdout=StringIO())
+        with open(self.path('posts.jsonl.progress'), 'w') as stream:
+            json.dump({'kind': 'posts', 'done': 3}, stream)
+        call_command('import_data', 'posts', self.path('posts.jsonl'),
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(os.path.exists(self.path('posts.jsonl.progress')))
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+COMMENTS = settings.COMMENT_PAGING_COUNT + 5
+
+
+# Здесь проверяется то, что лежит под кэшем страниц.
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=reader, text=f'Комментарий {number}')
+            for number in range(COMMENTS))
+
+    def setUp(self):
+        self.client = Client()
+
+    def texts(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_post_detail_shows_first_page_oldest_first(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        self.assertEqual(
+            self.texts(response),
+            [f'Комментарий {number}'
+             for number in range(settings.COMMENT_PAGING_COUNT)])
+        self.assertContains(response, 'data-comments-url=')
+
+    def test_fragment_loads_next_page(self):
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        cursor = first.context['comments'].next_cursor
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:post_comments', args=[self.post.id]),
+                {'cursor': cursor})
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            self.texts(response),
+            [f'Комментарий {number}'
+             for number in range(settings.COMMENT_PAGING_COUNT, COMMENTS)])
+        self.assertNotContains(response, 'data-comments-url=')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]),
+            {'comments': cursor})
+        self.assertEqual(len(self.texts(response)), 5)
+
+    def test_api_pages_comments(self):
+        data = self.client.get(
+            reverse('api_v1:post_detail', args=[self.post.id])).json()
+        comments = data['comments']
+        self.assertEqual(
+            len(comments['results']), settings.COMMENT_PAGING_COUNT)
+        rest = self.client.get(comments['next']).json()
+        self.assertEqual(len(rest['results']), 5)
+        self.assertIsNone(rest['next'])
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes_and_deletes(self):
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Комментарий'}
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+        post.delete()
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7)
+        Post.objects.update(comments_count=7)
+        UserStats.objects.filter(user=self.user).delete()
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+
+    def test_profile_reads_posts_counter(self):
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=5)
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response.context['number_of_posts'], 5)
@@ -122,17 +122,13 @@ class PostsFormsTests(TestCase):
         )
 
     def test_cache(self):
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:index')).content
         Post.objects.create(
             author=self.user,
-            text='Тестовый текст'
-        )
-        self.assertEqual(
-            response,
-            self.authorized_client.get(reverse('posts:index')).content
-        )
-        cache.clear()
-        self.assertNotEqual(
-            response,
-            self.authorized_client.get(reverse('posts:index')).content
+            text='Новый текст'
         )
+        new_response = self.authorized_client.get(
+            reverse('posts:index')).content
+        self.assertNotEqual(response, new_response)
+        self.assertIn('Новый текст'.encode(), new_response)
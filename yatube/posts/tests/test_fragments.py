@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.fragments import cache_stats
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+# Здесь проверяется то, что лежит под кэшем страниц.
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='HasNoName', first_name='Иван', last_name='Иванов')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def index(self):
+        return self.guest_client.get(reverse('posts:index')).content.decode()
+
+    def test_second_render_is_served_from_cache(self):
+        self.index()
+        before = cache_stats()
+        self.index()
+        after = cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'], before['misses'])
+
+    def test_changes_invalidate_fragment(self):
+        self.assertIn('Иван Иванов', self.index())
+
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        self.assertIn('Исправленный текст', self.index())
+
+        self.user.last_name = 'Петров'
+        self.user.save()
+        self.assertIn('Иван Петров', self.index())
+
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertIn('/group/new-slug/', self.index())
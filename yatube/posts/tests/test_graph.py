@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryAudit
+from posts import graph
+from posts.models import Follow, UserStats
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('anna', 'boris', 'clara', 'dima', 'egor')
+        }
+        for user, author in (('anna', 'boris'), ('anna', 'clara'),
+                             ('boris', 'dima'), ('boris', 'egor'),
+                             ('boris', 'anna'), ('clara', 'dima')):
+            self.follow(user, author)
+        self.anna = self.users['anna']
+
+    def follow(self, user, author):
+        return Follow.objects.create(
+            user=self.users[user], author=self.users[author])
+
+    def suggested(self, name):
+        return [(suggestion.candidate.username, suggestion.score)
+                for suggestion in graph.suggestions(self.users[name], 10)]
+
+    def test_follow_status_is_one_cached_query(self):
+        ids = [user.id for user in self.users.values()]
+        with self.assertNumQueries(1):
+            status = graph.follow_status(self.anna, ids)
+        self.assertEqual(
+            status, {self.users['boris'].id, self.users['clara'].id})
+        with self.assertNumQueries(0):
+            graph.follow_status(self.anna, ids)
+        self.follow('anna', 'dima')
+        self.assertIn(self.users['dima'].id,
+                      graph.follow_status(self.anna, ids))
+
+    def test_suggestions_are_ranked_friends_of_friends(self):
+        graph.compute_stale()
+        # Себя и тех, на кого уже подписана, anna не видит.
+        self.assertEqual(self.suggested('anna'), [('dima', 2), ('egor', 1)])
+        self.assertEqual(self.suggested('boris'), [('clara', 1)])
+
+    def test_only_affected_users_are_recomputed(self):
+        graph.compute_stale()
+        self.follow('clara', 'egor')
+        stale = set(UserStats.objects.filter(
+            suggestions_stale=True).values_list('user__username', flat=True))
+        # Подписки clara изменились — у неё и у её подписчицы anna.
+        self.assertEqual(stale, {'clara', 'anna'})
+        users, _ = graph.compute_stale(batch_size=1)
+        self.assertEqual(users, 2)
+        self.assertEqual(self.suggested('anna'), [('dima', 2), ('egor', 2)])
+
+    def test_followed_candidate_disappears_before_recompute(self):
+        graph.compute_stale()
+        self.follow('anna', 'dima')
+        self.assertEqual(self.suggested('anna'), [('egor', 1)])
+
+    def test_self_follow_is_rejected_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.follow('anna', 'anna')
+
+    @override_settings(FOLLOW_PAGING_COUNT=1)
+    def test_follow_lists(self):
+        self.client.force_login(self.anna)
+        url = reverse('posts:profile_followers', kwargs={'username': 'dima'})
+        with QueryAudit() as audit:
+            response = self.client.get(url)
+        audit.assert_clean()
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        self.assertEqual(response.context['people'],
+                         [(self.users['clara'], True)])
+        response = self.client.get(reverse(
+            'posts:profile_following', kwargs={'username': 'boris'}))
+        self.assertEqual(response.context['people'],
+                         [(self.users['anna'], False)])
+
+    def test_follow_index_shows_suggestions(self):
+        call_command('compute_suggestions', all=True, stdout=StringIO())
+        self.client.force_login(self.anna)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Возможно, вы знакомы')
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=['dima']))
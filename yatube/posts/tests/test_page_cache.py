@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core import page_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=['group']),
+            'other_group': reverse('posts:group_list', args=['other']),
+            'profile': reverse('posts:profile', args=['author']),
+            'post': reverse('posts:post_detail', args=[self.post.id]),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cached(self):
+        """Страницы, которые анонимный читатель получает из кэша."""
+        cached = set()
+        for name, url in self.urls.items():
+            response = self.client.get(url)
+            if response.context is None:
+                cached.add(name)
+        return cached
+
+    def test_repeated_anonymous_request_skips_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.urls['index'])
+        self.assertContains(response, 'Пост')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_query_string_is_part_of_key(self):
+        response = self.client.get(self.urls['index'], {'page': 2})
+        self.assertIsNotNone(response.context)
+
+    def test_logged_in_user_is_not_served_from_cache(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(self.urls['profile'])
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'Подписаться')
+
+    def test_new_post_purges_feeds_it_appears_in(self):
+        Post.objects.create(author=self.author, group=self.group, text='Новый')
+        # На странице поста показано число постов автора.
+        self.assertEqual(self.cached(), {'other_group'})
+        self.assertContains(self.client.get(self.urls['index']), 'Новый')
+
+    def test_comment_purges_only_its_post(self):
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        self.assertEqual(
+            self.cached(), set(self.urls) - {'post'})
+        self.assertContains(
+            self.client.get(self.urls['post']), 'Комментарий')
+
+    def test_follow_purges_profile_counters(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.cached(), set(self.urls) - {'profile'})
+
+    def test_group_change_purges_pages_showing_it(self):
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(self.cached(), {'other_group'})
+
+    def test_page_changed_during_render_is_not_cached(self):
+        renders = []
+
+        @page_cache.cache_anonymous
+        def view(request):
+            renders.append(request)
+            page_cache.tag(request, 'scope')
+            if len(renders) == 1:
+                page_cache.purge('scope')
+            return HttpResponse('ok')
+
+        for _ in range(3):
+            request = RequestFactory().get('/render/')
+            request.user = AnonymousUser()
+            view(request)
+        self.assertEqual(len(renders), 2)
+
+    def test_purged_page_is_rebuilt_by_one_worker(self):
+        Post.objects.create(author=self.author, text='Новый')
+        # Другой воркер уже собирает ленту заново.
+        lock_key = page_cache._page_key(
+            RequestFactory().get(self.urls['index'])) + ':lock'
+        cache.add(lock_key, True)
+        response = self.client.get(self.urls['index'])
+        self.assertIsNone(response.context)
+        self.assertNotContains(response, 'Новый')
+        cache.delete(lock_key)
+        self.assertContains(self.client.get(self.urls['index']), 'Новый')
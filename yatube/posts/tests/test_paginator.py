@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.paginator import ApproximatePaginator, CursorPaginator
+
+User = get_user_model()
+
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        for number in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Тестовый текст {number}',
+                author=cls.user,
+                group=cls.group
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_cursor_walks_whole_feed_without_gaps(self):
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        seen = []
+        page = self.paginator.get_cursor_page()
+        while True:
+            seen.extend(page.object_list)
+            if page.next_cursor is None:
+                break
+            page = self.paginator.get_cursor_page(page.next_cursor)
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.paginator.get_cursor_page()
+        second = self.paginator.get_cursor_page(first.next_cursor)
+        third = self.paginator.get_cursor_page(second.next_cursor)
+        back = self.paginator.get_cursor_page(third.previous_cursor)
+        self.assertEqual(back.object_list, second.object_list)
+        self.assertIsNone(first.previous_cursor)
+        self.assertEqual(len(third), POSTS_COUNT - 20)
+        self.assertIsNone(third.next_cursor)
+
+    def test_bad_cursor_returns_first_page(self):
+        first = self.paginator.get_cursor_page()
+        for cursor in ('garbage', 'bnx8MjAyMXwx', ''):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_cursor_page(cursor)
+                self.assertEqual(page.object_list, first.object_list)
+
+    def test_page_number_out_of_range_returns_last_page(self):
+        last = list(Post.objects.order_by('-pub_date', '-id')[20:])
+        for number in ('4', '99999999999999999999'):
+            with self.subTest(number=number):
+                page = self.paginator.get_offset_page(number)
+                self.assertEqual(page.number, 3)
+                self.assertEqual(page.object_list, last)
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': '99999999999999999999'})
+        self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(
+            reverse('api:index'), {'page': '99999999999999999999'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_pages_do_not_count_rows(self):
+        first = self.guest_client.get(reverse('posts:index'))
+        cursor = first.context['page_obj'].next_cursor
+        pages = [
+            reverse('posts:index') + f'?cursor={cursor}',
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'HasNoName'}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(page)
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    settings.POST_PAGING_COUNT
+                )
+                sql = ' '.join(query['sql'] for query in queries)
+                self.assertNotIn('OFFSET', sql)
+
+
+class ApproximatePaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {number}', author=cls.user)
+            for number in range(POSTS_COUNT))
+        cls.posts = Post.objects.order_by('id')
+
+    def test_low_count_does_not_hide_pages(self):
+        paginator = ApproximatePaginator(self.posts, 10, count=5)
+        page = paginator.get_page(3)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.count, POSTS_COUNT)
+
+    def test_high_count_is_corrected_at_the_end(self):
+        paginator = ApproximatePaginator(self.posts, 10, count=1000)
+        self.assertTrue(paginator.get_page(2).has_next())
+        page = paginator.get_page(50)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.count, POSTS_COUNT)
+
+    def test_page_links_are_a_window(self):
+        paginator = ApproximatePaginator(self.posts, 10, count=1000)
+        cases = {
+            1: [1, 2, 3, None, 100],
+            5: [1, 2, 3, 4, 5, 6, 7, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+        }
+        for number, links in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(paginator.page_links(number), links)
+
+    @override_settings(FOLLOW_PAGING_COUNT=2)
+    def test_follow_list_uses_counter_instead_of_count(self):
+        for number in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=self.user)
+        url = reverse('posts:profile_followers', args=['HasNoName'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 2})
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql.upper())
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.links, [1, 2, 3])
+        self.assertContains(response, '?page=3')
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import QueryAudit, normalize
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+AUTHORS = 12
+
+
+class QueryAuditTests(TestCase):
+    """Страницы posts не делают запрос на каждую запись в ленте."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        groups = [
+            Group.objects.create(title=f'Группа {number}',
+                                 slug=f'group-{number}', description='')
+            for number in range(3)
+        ]
+        for number in range(AUTHORS):
+            author = User.objects.create_user(
+                username=f'author{number}', first_name=f'Имя {number}')
+            post = Post.objects.create(
+                author=author, text=f'Запись {number}',
+                group=groups[number % len(groups)])
+            Follow.objects.create(user=cls.reader, author=author)
+            Comment.objects.create(post=post, author=author, text='Текст')
+        cls.post = post
+        cls.group = groups[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_views_have_no_repeated_queries(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.post.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=запись',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with QueryAudit(slow_ms=1000) as audit:
+                    self.client.get(url)
+                audit.assert_clean()
+
+    def test_attribute_access_in_loop_is_reported(self):
+        with QueryAudit() as audit:
+            names = [post.author.username for post in Post.objects.all()]
+        self.assertEqual(len(names), AUTHORS)
+        problems = audit.problems()
+        self.assertEqual(len(problems), 1)
+        self.assertIn(f'N+1: {AUTHORS} одинаковых запросов', problems[0])
+        self.assertIn('posts/tests/test_queries.py', problems[0])
+        with self.assertRaises(AssertionError):
+            audit.assert_clean()
+
+    def test_slow_queries_are_reported(self):
+        with QueryAudit(slow_ms=0) as audit:
+            Post.objects.count()
+        self.assertIn('Медленный запрос', audit.problems()[0])
+
+    def test_normalize_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 5'),
+            normalize("SELECT  * FROM t WHERE id IN (%s) AND x = 'y'"),
+        )
+
+    @override_settings(QUERY_AUDIT=True, QUERY_AUDIT_SLOW_MS=0)
+    def test_middleware_logs_problems(self):
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            self.client.get(reverse(
+                'posts:profile', kwargs={'username': 'author0'}))
+        self.assertIn('GET /profile/author0/: Медленный запрос',
+                      logs.output[0])
+
+    @override_settings(QUERY_AUDIT_SLOW_MS=0)
+    def test_middleware_is_off_by_default(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.queries', 'WARNING'):
+                self.client.get(reverse('posts:index'))
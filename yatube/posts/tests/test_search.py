@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_a_stem(self):
+        for forms in (('пост', 'посты', 'постами'),
+                      ('красивая', 'красивейший'),
+                      ('ёлки', 'елками')):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_non_russian_words_are_lowercased(self):
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchTests(TestCase):
+    backend = 'auto'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    def setUp(self):
+        settings = override_settings(SEARCH_BACKEND=self.backend)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        search.rebuild()
+
+    def found(self, query):
+        return [post.text for post in search.search(query)[:10]]
+
+    def test_ranks_by_relevance(self):
+        Post.objects.create(author=self.user, text='Про котов и собак')
+        Post.objects.create(
+            author=self.user, text='Кот, котами, коты: всё о котах')
+        Post.objects.create(author=self.user, text='Только собаки')
+        self.assertEqual(self.found('коты'), [
+            'Кот, котами, коты: всё о котах',
+            'Про котов и собак',
+        ])
+        self.assertEqual(self.found('котики собаками'), [])
+        self.assertEqual(self.found('кот собака'), ['Про котов и собак'])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.user, text='Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новые'), ['Новый текст'])
+        post.delete()
+        self.assertEqual(self.found('новые'), [])
+
+    def test_search_page_is_paginated(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Заметка номер {number}')
+            for number in range(13))
+        search.rebuild()
+        client = Client()
+        response = client.get(reverse('posts:search'), {'q': 'заметки'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 13)
+        self.assertEqual(len(page_obj.object_list), 10)
+        self.assertContains(response, '?q=%D0%B7%D0%B0%D0%BC%D0%B5%D1%82'
+                                      '%D0%BA%D0%B8&page=2')
+        response = client.get(
+            reverse('posts:search'), {'q': 'заметки', 'page': 2})
+        self.assertEqual(len(response.context['page_obj'].object_list), 3)
+
+
+class PythonSearchTests(SearchTests):
+    backend = 'python'
+
+    def test_database_ranks_and_slices_the_page(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Заметка ' + 'заметка ' * number)
+            for number in range(13))
+        search.rebuild()
+        search.search('заметки').count()
+        results = search.search('заметки')
+        with CaptureQueriesContext(connection) as queries:
+            page = results[10:13]
+        self.assertEqual([post.text.count('аметка') for post in page],
+                         [3, 2, 1])
+        # Частоты слов, страница id и сами посты; число постов для IDF
+        # уже в кэше.
+        self.assertEqual(len(queries), 3)
+        self.assertIn('GROUP BY', queries[1]['sql'])
+        self.assertIn('LIMIT 3', queries[1]['sql'])
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from posts import benchmark, urls
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command('seed_data', users=30, posts=200, groups=3, follows=5,
+                     comments=100, images=2, seed=1, stdout=StringIO())
+
+    def test_seed_creates_consistent_data(self):
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(author__following__user=follow.user).count())
+        post = Comment.objects.first().post
+        self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_activity_is_skewed(self):
+        top = Post.objects.values('author').annotate(
+            total=Count('id')).order_by('-total').first()
+        self.assertGreater(top['total'], 200 / 30 * 3)
+
+    def test_benchmark_covers_every_url(self):
+        report = benchmark.run(requests=2, warmup=0)
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(set(report['urls']) & names, names)
+        self.assertEqual(report['urls']['index']['status'], 200)
+        self.assertEqual(report['urls']['follow_index (вход)']['status'], 200)
+        self.assertEqual(
+            report['urls']['profile_unfollow (вход)']['status'], 302)
+        for result in report['urls'].values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        # Запросы подписки откатываются вместе с транзакцией замера.
+        self.assertEqual(Follow.objects.count(), report['data']['follows'])
+
+    def test_benchmark_command_writes_report(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'report.json')
+        call_command('benchmark_views', requests=1, warmup=0, output=path,
+                     stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_views', requests=1, warmup=0, compare=path,
+                     stdout=out)
+        with open(path, encoding='utf-8') as stream:
+            self.assertIn('index', json.load(stream)['urls'])
+        self.assertIn('index: p95', out.getvalue())
+
+    def test_render_benchmark_compares_loaders(self):
+        follows = Follow.objects.count()
+        report = benchmark.render_times(requests=2)
+        self.assertEqual(set(report['index']), {'cached', 'uncached'})
+        self.assertGreater(report['index']['cached']['p50_ms'], 0)
+        # Перенаправления ничего не рисуют и в отчёт не попадают.
+        self.assertNotIn('profile_follow (вход)', report)
+        self.assertEqual(Follow.objects.count(), follows)
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Task
+from posts import thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    def index(self):
+        return self.guest_client.get(reverse('posts:index')).content.decode()
+
+    def test_pending_thumbnail_falls_back_to_original(self):
+        self.assertEqual(self.post.thumbnail_url, '')
+        self.assertIn(self.post.image.url, self.index())
+
+    def test_generated_thumbnail_is_rendered(self):
+        url = thumbnails.generate(self.post.id)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_url, url)
+        page = self.index()
+        self.assertIn(url, page)
+        self.assertNotIn(self.post.image.url, page)
+
+    def test_edit_with_new_image_resets_thumbnail(self):
+        thumbnails.generate(self.post.id)
+        client = Client()
+        client.force_login(self.user)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={
+                'text': 'Тестовый текст',
+                'image': SimpleUploadedFile(
+                    name='other.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                ),
+            }
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_url, '')
+        self.assertTrue(
+            Task.objects.filter(name=thumbnails.generate.task_name).exists())
+
+    def test_renditions_are_offered_in_srcset(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 900), 'teal').save(buffer, 'PNG')
+        post = Post.objects.create(
+            text='Большая картинка',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='big.png',
+                content=buffer.getvalue(),
+                content_type='image/png'
+            )
+        )
+        thumbnails.generate(post.id)
+        post.refresh_from_db()
+        jpeg_srcset, sources = thumbnails.picture_sources(post)
+        for width in settings.POST_IMAGE_WIDTHS:
+            self.assertIn(f'big_{width}w.jpg {width}w', jpeg_srcset)
+        self.assertEqual(
+            [mime for mime, srcset in sources],
+            [thumbnails.FORMATS[fmt][2]
+             for fmt in thumbnails.supported_formats()]
+        )
+        page = self.index()
+        self.assertIn('<picture>', page)
+        self.assertIn(f'sizes="{thumbnails.SIZES}"', page)
+
+    def test_small_image_is_not_upscaled_to_every_width(self):
+        thumbnails.generate(self.post.id)
+        self.post.refresh_from_db()
+        jpeg_srcset, _ = thumbnails.picture_sources(self.post)
+        self.assertEqual(jpeg_srcset, f'{self.post.thumbnail_url} 960w')
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def follow_page(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_new_posts_are_pushed(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.follow_page(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_posts_are_read_on_request(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_page(), [new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=3, TIMELINE_PUSH_RATIO=0.5)
+    def test_author_losing_followers_is_pushed_again(self):
+        others = [User.objects.create_user(username=name)
+                  for name in ('first', 'second')]
+        for user in (self.reader, *others):
+            Follow.objects.create(user=user, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(self.follow_page(), [new_post, self.old_post])
+        # Ниже порога, но выше порога возврата: режим не меняется.
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(self.follow_page(), [new_post, self.old_post])
+        Follow.objects.filter(user=others[1]).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post).exists())
+        self.assertEqual(self.follow_page(), [new_post, self.old_post])
+        pushed_post = Post.objects.create(text='Ещё пост', author=self.author)
+        self.assertEqual(
+            self.follow_page(), [pushed_post, new_post, self.old_post])
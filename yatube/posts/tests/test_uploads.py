@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.uploads import BoundedUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def jpeg_with_exif(size):
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=True)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, name, content):
+        return self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                name=name, content=content, content_type='image/jpeg'),
+        })
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_rejected(self):
+        response = self.create('big.jpg', jpeg_with_exif((400, 400)) * 4)
+        self.assertTrue(
+            response.context['form'].has_error('image', 'too_large'))
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=1024,
+                       FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_oversized_upload_stops_reading_request(self):
+        response = self.create('big.jpg', jpeg_with_exif((400, 400)) * 4)
+        form = response.context['form']
+        self.assertTrue(form.has_error('image', 'too_large'))
+        self.assertEqual(form['text'].value(), 'Пост с картинкой')
+        self.assertEqual(response.wsgi_request.oversized_uploads, {'image'})
+        self.assertNotIn('image', response.wsgi_request.FILES)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_handler_stops_once_limit_is_crossed(self):
+        request = RequestFactory().post('/')
+        handler = BoundedUploadHandler(request)
+        handler.handle_raw_input(None, {}, 4096, b'boundary')
+        handler.new_file('image', 'big.jpg', 'image/jpeg', None)
+        self.assertEqual(handler.receive_data_chunk(b'x' * 1024, 0),
+                         b'x' * 1024)
+        with self.assertRaises(StopUpload) as stop:
+            handler.receive_data_chunk(b'x', 1024)
+        self.assertTrue(stop.exception.connection_reset)
+        self.assertEqual(request.oversized_uploads, {'image'})
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_is_rejected(self):
+        response = self.create('wide.jpg', jpeg_with_exif((20, 20)))
+        self.assertTrue(
+            response.context['form'].has_error('image', 'too_many_pixels'))
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_DIMENSION=100)
+    def test_huge_image_is_downscaled_without_exif(self):
+        self.create('photo.jpg', jpeg_with_exif((400, 200)))
+        post = Post.objects.get()
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+        self.assertEqual(len(post.image_hash), 64)
+
+    def test_identical_images_are_stored_once(self):
+        content = jpeg_with_exif((40, 40))
+        self.create('first.jpg', content)
+        self.create('second.jpg', content)
+        first, second = Post.objects.order_by('id')
+        self.assertEqual(first.image_hash, second.image_hash)
+        self.assertEqual(first.image.name, 'posts/first.jpg')
+        self.assertEqual(second.image.name, first.image.name)
@@ -5,7 +5,10 @@ import tempfile
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
@@ -242,3 +245,62 @@ class PostsPagesTests(TestCase):
         )
         self.assertFalse(Follow.objects.filter(
             user=self.user2, author=self.user).exists())
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Описание',
+            slug='test-slug'
+        )
+        for number in range(15):
+            author = User.objects.create_user(
+                username=f'author{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}'
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(
+                text='Тестовый текст',
+                author=author,
+                group=cls.group
+            )
+        cls.profile_author = author
+        for number in range(14):
+            Post.objects.create(
+                text='Тестовый текст',
+                author=author,
+                group=cls.group
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов страницы ленты не зависит от числа постов."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile',
+                    kwargs={'username': self.profile_author.username}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with self.settings(POST_PAGING_COUNT=1):
+                    small_page = self.count_queries(url)
+                with self.settings(POST_PAGING_COUNT=15):
+                    large_page = self.count_queries(url)
+                self.assertEqual(small_page, large_page)
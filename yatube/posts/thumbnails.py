@@ -0,0 +1,123 @@
+"""Фоновая подготовка вариантов картинок постов.
+
+Раньше превью 960x339 делал тег {% thumbnail %} при первой отрисовке
+страницы, прямо в запросе. Теперь после сохранения поста задача
+очереди (core.tasks) один раз готовит набор вариантов: несколько ширин
+в JPEG и, если Pillow умеет, в WebP и AVIF. Шаблоны отдают их через
+srcset, и телефоны скачивают картинку поменьше. Пока варианты не
+готовы, шаблоны показывают исходную картинку.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core import routers, tasks
+
+from . import freshness, pages
+from .models import Post
+
+BASE_WIDTH = 960
+ASPECT_RATIO = 339 / 960
+RENDITIONS_DIR = 'posts/renditions'
+SIZES = f'(max-width: {BASE_WIDTH}px) 100vw, {BASE_WIDTH}px'
+
+# Формат: (имя кодека Pillow, расширение, MIME-тип, параметры сохранения).
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 60}),
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg',
+             {'quality': 85, 'progressive': True}),
+}
+
+
+def supported_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [fmt for fmt in settings.POST_IMAGE_FORMATS
+            if fmt in FORMATS and FORMATS[fmt][0] in Image.SAVE]
+
+
+def rendition_name(image_name, width, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{width}w.{extension}'
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def build_renditions(image_name, source):
+    """Сохраняет варианты картинки, возвращает {MIME-тип: srcset}."""
+    source = source.convert('RGB')
+    widths = sorted(
+        {width for width in settings.POST_IMAGE_WIDTHS
+         if width <= source.width} | {BASE_WIDTH}
+    )
+    resized = [
+        (width, ImageOps.fit(
+            source, (width, round(width * ASPECT_RATIO)), Image.LANCZOS))
+        for width in widths
+    ]
+    srcsets = {}
+    for fmt in supported_formats() + ['jpeg']:
+        codec, extension, mime, params = FORMATS[fmt]
+        entries = []
+        for width, image in resized:
+            buffer = BytesIO()
+            image.save(buffer, codec, **params)
+            name = _save(rendition_name(image_name, width, extension),
+                         buffer.getvalue())
+            entries.append(f'{default_storage.url(name)} {width}w')
+        srcsets[mime] = ', '.join(entries)
+    return srcsets
+
+
+@tasks.task
+def generate(post_id):
+    """Готовит варианты картинки поста, возвращает адрес основного."""
+    # Пост только что сохранён, реплика могла его ещё не получить.
+    with routers.use_primary():
+        post = Post.objects.filter(id=post_id).only(
+            'image', 'author', 'group').first()
+    if post is None or not post.image:
+        return None
+    with post.image.open('rb') as image_file:
+        source = Image.open(image_file)
+        source.load()
+    srcsets = build_renditions(post.image.name, source)
+    thumbnail_url = default_storage.url(
+        rendition_name(post.image.name, BASE_WIDTH, FORMATS['jpeg'][1]))
+    # Картинку могли заменить, пока готовились варианты.
+    updated = Post.objects.filter(id=post_id, image=post.image.name).update(
+        thumbnail_url=thumbnail_url,
+        image_srcset=json.dumps(srcsets),
+        updated=timezone.now(),
+    )
+    if updated:
+        freshness.touch_post(post.id, post.author_id, post.group_id)
+        pages.purge_post(post.id, post.author_id, post.group_id)
+    return thumbnail_url
+
+
+def picture_sources(post):
+    """srcset для JPEG и список (MIME-тип, srcset) современных форматов."""
+    try:
+        srcsets = dict(json.loads(post.image_srcset))
+    except (TypeError, ValueError):
+        srcsets = {}
+    jpeg = srcsets.pop(FORMATS['jpeg'][2], post.thumbnail_url)
+    return jpeg, list(srcsets.items())
+
+
+def schedule(post):
+    """Ставит подготовку превью в очередь задач."""
+    if post.image:
+        tasks.enqueue(generate, post.id)
@@ -0,0 +1,199 @@
+"""Лента подписок, разложенная по пользователям заранее (fan-out on write).
+
+Пост при публикации копируется в ленты подписчиков автора, поэтому
+/follow/ читает одну таблицу по индексу (user, pub_date) вместо
+соединения Follow и Post. Для авторов с очень большим числом
+подписчиков раскладка дорогая: их посты не копируются, а добираются
+при чтении ленты (fan-out on read).
+
+Режим автора хранится в UserStats.timeline_pulled и переключается в
+is_pulled. Обратно к раскладке автор возвращается при заметно меньшем
+числе подписчиков (TIMELINE_PUSH_RATIO), и тогда его последние посты
+раскладываются всем подписчикам: пока он читался при открытии ленты,
+в их ленты ничего не попадало.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from core import tasks
+from core.cache import get_or_compute
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+PULLED_AUTHORS_KEY = 'timeline:pulled_authors'
+PULLED_AUTHORS_TIMEOUT = 300
+BATCH_SIZE = 500
+
+
+def pulled_authors():
+    """id авторов, чьи посты не раскладываются по лентам."""
+    return get_or_compute(
+        PULLED_AUTHORS_KEY,
+        lambda: set(
+            UserStats.objects.filter(timeline_pulled=True)
+            .values_list('user_id', flat=True)
+        ),
+        PULLED_AUTHORS_TIMEOUT,
+    )
+
+
+def is_pulled(author_id):
+    """Читаются ли посты автора при открытии ленты.
+
+    Переключает режим, если число подписчиков пересекло порог.
+    """
+    followers, pulled = UserStats.objects.filter(
+        user_id=author_id).values_list(
+        'followers_count', 'timeline_pulled').first() or (0, False)
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if not pulled and followers >= limit:
+        UserStats.objects.filter(
+            user_id=author_id, timeline_pulled=False).update(
+            timeline_pulled=True)
+        pulled = True
+    elif pulled and followers < limit * settings.TIMELINE_PUSH_RATIO:
+        with transaction.atomic():
+            # Раскладывает тот, кто переключил режим.
+            if UserStats.objects.filter(
+                    user_id=author_id, timeline_pulled=True).update(
+                    timeline_pulled=False):
+                _backfill_followers(author_id)
+        pulled = False
+    if pulled != (author_id in pulled_authors()):
+        cache.delete(PULLED_AUTHORS_KEY)
+    return pulled
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """После подписки добавляет в ленту последние посты автора."""
+    if is_pulled(author_id):
+        return
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id,
+                       author_id=author_id, pub_date=pub_date)
+         for post_id, pub_date in _recent_posts(author_id)],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def _recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('id', 'pub_date')
+        [:settings.TIMELINE_BACKFILL_COUNT])
+
+
+def _backfill_followers(author_id):
+    """Кладёт последние посты автора в ленты всех его подписчиков."""
+    posts = _recent_posts(author_id)
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.extend(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def prune(user_id, author_id):
+    """После отписки убирает из ленты посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@tasks.task
+def fan_out_post(post_id):
+    """Задача: раскладывает пост, если его ещё не удалили."""
+    post = Post.objects.filter(id=post_id).only(
+        'author', 'pub_date').first()
+    if post is not None:
+        fan_out(post)
+
+
+@tasks.task
+def sync_follow(user_id, author_id):
+    """Задача: приводит ленту к текущему состоянию подписки."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+    else:
+        prune(user_id, author_id)
+        # Отписка могла вернуть автора к раскладке.
+        is_pulled(author_id)
+
+
+def rebuild():
+    """Собирает ленты подписок заново, возвращает число подписок.
+
+    Подписки идут по авторам: последние посты автора читаются один раз
+    и раскладываются сразу всем его подписчикам.
+    """
+    TimelineEntry.objects.all().delete()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    UserStats.objects.filter(followers_count__gte=limit).update(
+        timeline_pulled=True)
+    UserStats.objects.filter(followers_count__lt=limit).update(
+        timeline_pulled=False)
+    cache.delete(PULLED_AUTHORS_KEY)
+    pulled = pulled_authors()
+    follows = Follow.objects.order_by('author_id').values_list(
+        'author_id', 'user_id')
+    count = 0
+    batch = []
+    author_id = posts = None
+    for follower_author_id, user_id in follows.iterator():
+        count += 1
+        if follower_author_id in pulled:
+            continue
+        if follower_author_id != author_id:
+            author_id = follower_author_id
+            posts = _recent_posts(author_id)
+        batch.extend(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return count
+
+
+def feed_for(user):
+    """Посты ленты подписок с ключом сортировки feed_date для курсора."""
+    pulled = list(
+        Follow.objects.filter(user=user, author_id__in=pulled_authors())
+        .values_list('author_id', flat=True)
+    )
+    if not pulled:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'))
+    pushed = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(id__in=pushed) | Q(author_id__in=pulled)
+    ).annotate(feed_date=F('pub_date'))
@@ -0,0 +1,156 @@
+"""Приём картинок постов: лимиты, уменьшение, очистка EXIF и дедупликация.
+
+Приём файла длиннее POST_IMAGE_MAX_UPLOAD_SIZE байт прерывается, и
+остаток тела запроса даже не читается, поэтому большой файл не
+занимает ни память, ни диск, ни время воркера. Слишком большие по
+размеру или по числу пикселей картинки отклоняются до декодирования.
+Огромные оригиналы уменьшаются, EXIF (с геометкой и прочим)
+удаляется, а по SHA-256 содержимого одинаковые картинки хранятся в
+posts/ один раз.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+from .models import Post
+
+SAVE_PARAMS = {
+    'JPEG': {'quality': 90},
+    'WEBP': {'quality': 90},
+}
+
+
+class BoundedUploadHandler(FileUploadHandler):
+    """Прерывает приём файла, как только тот превысил допустимый размер.
+
+    Сам файл принимают следующие обработчики — в памяти или во
+    временном файле. Имя прерванного поля запоминается в
+    request.oversized_uploads, чтобы форма могла отклонить загрузку с
+    понятной ошибкой.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # В тело не длиннее лимита большой файл не поместится.
+        self.counting = content_length > settings.POST_IMAGE_MAX_UPLOAD_SIZE
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 *args, **kwargs):
+        super().new_file(field_name, file_name, content_type,
+                         content_length, *args, **kwargs)
+        self.received = 0
+        if (self.counting and content_length is not None
+                and content_length > settings.POST_IMAGE_MAX_UPLOAD_SIZE):
+            self._stop()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.counting:
+            self.received += len(raw_data)
+            if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+                self._stop()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def _stop(self):
+        if self.request is not None:
+            if not hasattr(self.request, 'oversized_uploads'):
+                self.request.oversized_uploads = set()
+            self.request.oversized_uploads.add(self.field_name)
+        raise StopUpload(connection_reset=True)
+
+
+def oversized_uploads(request):
+    """Поля, приём файлов которых прерван из-за размера."""
+    return getattr(request, 'oversized_uploads', set())
+
+
+def too_large_error():
+    return ValidationError(
+        'Файл больше %(limit)s.',
+        code='too_large',
+        params={'limit': filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)},
+    )
+
+
+def check_limits(file):
+    """Проверяет размер файла и число пикселей до декодирования картинки."""
+    if file.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise too_large_error()
+    if _pixels(file) > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)g мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS / 10 ** 6},
+        )
+
+
+def _pixels(file):
+    """Число пикселей по заголовку картинки, без её декодирования."""
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except Exception:
+        # Не картинка: ошибку покажет стандартная проверка ImageField.
+        return 0
+    finally:
+        file.seek(0)
+    return width * height
+
+
+def file_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def process(upload):
+    """Уменьшает огромную картинку и убирает EXIF.
+
+    Возвращает файл для сохранения и SHA-256 его содержимого. Картинки
+    без EXIF и в пределах POST_IMAGE_MAX_DIMENSION, а также анимации
+    сохраняются как есть, без потерь от перекодирования.
+    """
+    limit = settings.POST_IMAGE_MAX_DIMENSION
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if (getattr(image, 'is_animated', False)
+                or (max(image.size) <= limit and not image.getexif())):
+            return upload, file_hash(upload)
+        image_format = image.format
+        icc_profile = image.info.get('icc_profile')
+        # JPEG сразу декодируется в уменьшенном масштабе.
+        image.draft('RGB', (limit, limit))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        params = dict(SAVE_PARAMS.get(image_format, {}))
+        if icc_profile:
+            params['icc_profile'] = icc_profile
+        image.save(buffer, image_format, **params)
+    content = buffer.getvalue()
+    return (ContentFile(content, name=upload.name),
+            hashlib.sha256(content).hexdigest())
+
+
+def find_duplicate(image_hash):
+    """Имя уже сохранённой картинки с тем же содержимым или None."""
+    names = Post.objects.filter(image_hash=image_hash).exclude(
+        image='').values_list('image', flat=True).distinct()
+    for name in names[:5]:
+        if default_storage.exists(name):
+            return name
+    return None
@@ -1,19 +1,22 @@
-from django.core.paginator import Paginator
 from .models import Group, Post, Follow
+from django.conf import settings
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from core.page_cache import cache_anonymous
 from .forms import PostForm, CommentForm
-from django.conf import settings
+from .paginator import ApproximatePaginator, paginate, paginate_comments
+from . import (counters, graph, pages, scopes, search, thumbnails,
+               timeline, uploads)
 
 User = get_user_model()
 
 
+@cache_anonymous
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.POST_PAGING_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, Post.objects.for_feed())
+    pages.tag_feed(request, page_obj, scopes.ALL_POSTS)
     return render(
         request,
         'posts/index.html',
@@ -21,12 +24,12 @@ def index(request):
     )
 
 
+@cache_anonymous
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, settings.POST_PAGING_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, group.posts.for_feed())
+    pages.tag_feed(request, page_obj, scopes.group_scope(group.id),
+                   scopes.group_posts_scope(group.id))
     return render(
         request,
         'posts/group_list.html',
@@ -35,51 +38,76 @@ def group_posts(request, slug):
     )
 
 
+@cache_anonymous
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = counters.get_stats(author)
     following = (
-        request.user.is_authenticated
-        and request.user.username != username
-        and Follow.objects.filter(user=request.user, author=author).exists()
+        request.user.username != username
+        and graph.is_following(request.user, author)
     )
     posts_author = Post.objects.filter(author_id=author.id)
-    paginator = Paginator(posts_author, settings.POST_PAGING_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    number_of_posts = posts_author.count()
+    page_obj = paginate(request, posts_author.for_feed())
+    pages.tag_feed(request, page_obj, scopes.user_scope(author.id),
+                   scopes.user_posts_scope(author.id),
+                   scopes.user_follows_scope(author.id))
     return render(
         request,
         'posts/profile.html',
         {'author': author,
          'page_obj': page_obj,
          'posts_author': posts_author,
-         'number_of_posts': number_of_posts,
+         'number_of_posts': stats.posts_count,
+         'stats': stats,
          'following': following, }
     )
 
 
+@cache_anonymous
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
+    pages.tag_feed(request, [post], scopes.post_scope(post.id),
+                   scopes.user_posts_scope(post.author_id))
     form = CommentForm(request.POST or None)
     text = post.text
+    comments = paginate_comments(post, request.GET.get('comments'))
     return render(
         request,
         'posts/post_detail.html',
         {'post': post,
          'text': text,
+         'posts_count': counters.get_stats(post.author).posts_count,
          'form': form,
-         'comments': post.comments.all(), }
+         'comments': comments, }
+    )
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = paginate_comments(post, request.GET.get('cursor'))
+    return render(
+        request,
+        'posts/includes/comment_list.html',
+        {'post': post,
+         'comments': comments, }
     )
 
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    oversized=uploads.oversized_uploads(request))
     if request.method == "POST":
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            # Пост не сохранится без задачи подготовки превью.
+            with transaction.atomic():
+                post.save()
+                thumbnails.schedule(post)
             return redirect('posts:profile', username=post.author.username)
     return render(
         request,
@@ -97,10 +125,19 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        oversized=uploads.oversized_uploads(request)
     )
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            post.thumbnail_url = ''
+            post.image_srcset = ''
+            with transaction.atomic():
+                post.save()
+                thumbnails.schedule(post)
+        else:
+            post.save()
         return redirect('posts:post_detail', post_id=post_id)
 
     return render(
@@ -126,16 +163,27 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    )
-    paginator = Paginator(posts, settings.POST_PAGING_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
+    posts = timeline.feed_for(request.user).for_feed()
+    page_obj = paginate(request, posts, key_field='feed_date')
+    context = {
+        'page_obj': page_obj,
+        'suggestions': graph.suggestions(
+            request.user, settings.FOLLOW_SUGGESTIONS_SHOWN),
+    }
     return render(request, 'posts/follow.html', context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = ApproximatePaginator(
+            search.search(query), settings.POST_PAGING_COUNT)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     user = request.user
@@ -148,6 +196,44 @@ def profile_follow(request, username):
     return redirect('posts:follow_index')
 
 
+def _follow_list(request, username, followers):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = counters.get_stats(author)
+    if followers:
+        follows = graph.followers_of(author)
+        count = stats.followers_count
+    else:
+        follows = graph.following_of(author)
+        count = stats.following_count
+    paginator = ApproximatePaginator(
+        follows, settings.FOLLOW_PAGING_COUNT, count=count)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    people = [
+        follow.user if followers else follow.author for follow in page_obj
+    ]
+    # Статус подписки зрителя на каждого из списка — без запроса на
+    # каждого, из кэша графа подписок.
+    following = graph.follow_status(
+        request.user, [person.id for person in people])
+    context = {
+        'author': author,
+        'stats': stats,
+        'followers': followers,
+        'page_obj': page_obj,
+        'people': [(person, person.id in following) for person in people],
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def profile_followers(request, username):
+    return _follow_list(request, username, followers=True)
+
+
+def profile_following(request, username):
+    return _follow_list(request, username, followers=False)
+
+
 @login_required
 def profile_unfollow(request, username):
     get_object_or_404(
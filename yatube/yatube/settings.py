@@ -1,4 +1,5 @@
 import os
+import sys
 
 from dotenv import load_dotenv
 
@@ -25,12 +26,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 POST_PAGING_COUNT = 10
+COMMENT_PAGING_COUNT = 20
+# Списки по номерам страниц (posts.paginator.ApproximatePaginator) точно
+# считают записи, только если их меньше этого числа.
+PAGINATOR_EXACT_COUNT_LIMIT = 10000
 
 MIDDLEWARE = [
+    'core.perf.PerformanceMiddleware',
+    'core.queries.QueryAuditMiddleware',
+    'core.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,22 +45,55 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки работает только с DEBUG = True, иначе она лишь
+# замедляет каждый запрос.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Доля запросов, которые замеряет core.perf.PerformanceMiddleware
+# (от 0 до 1). При 0 middleware отключается. Замеры пишутся в лог
+# core.perf и, с PERF_SERVER_TIMING, в заголовок Server-Timing.
+PERF_SAMPLE_RATE = float(os.getenv('PERF_SAMPLE_RATE', default='0'))
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', default='1') == '1'
+
+# Поиск N+1 и медленных запросов (core.queries): одинаковый по форме
+# SQL, повторённый QUERY_AUDIT_REPEAT_LIMIT раз и больше, или запрос
+# дольше QUERY_AUDIT_SLOW_MS. С QUERY_AUDIT=1 находки каждого запроса к
+# сайту пишутся в лог core.queries.
+QUERY_AUDIT = os.getenv('QUERY_AUDIT', default='0') == '1'
+QUERY_AUDIT_REPEAT_LIMIT = 3
+QUERY_AUDIT_SLOW_MS = 100
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# С TEMPLATE_CACHE (по умолчанию, если не DEBUG) шаблоны разбираются
+# один раз на процесс кэширующим загрузчиком, а wsgi.py загружает их
+# все при старте (core.template_cache). Без него шаблон читается с
+# диска и разбирается при каждой отрисовке, что удобно при разработке.
+TEMPLATE_CACHE = os.getenv(
+    'TEMPLATE_CACHE', default='0' if DEBUG else '1') == '1'
+TEMPLATE_SOURCE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader',
+                  TEMPLATE_SOURCE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_SOURCE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -68,12 +108,69 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База данных задаётся переменными окружения. По умолчанию это SQLite
+# в db.sqlite3 для разработки; DB_ENGINE=postgresql включает PostgreSQL.
+# Соединения живут DB_CONN_MAX_AGE секунд и переиспользуются между
+# запросами, а перед каждым запросом проверяются (core.signals).
+# DB_POOLER=1 — соединения идут через PgBouncer в режиме transaction:
+# серверные курсоры тогда не переживают транзакцию и отключаются.
+DB_ENGINE = os.getenv('DB_ENGINE', default='sqlite3')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default='60'))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', default='yatube'),
+            'USER': os.getenv('DB_USER', default='yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', default=''),
+            'HOST': os.getenv('DB_HOST', default='localhost'),
+            'PORT': os.getenv('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == '1',
+            'OPTIONS': {
+                'connect_timeout': 5,
+                'application_name': 'yatube',
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.getenv(
+                'DB_NAME', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # WAL: чтение не ждёт записи; писатель ждёт блокировку до
+            # busy_timeout мс вместо ошибки «database is locked».
+            'PRAGMAS': {
+                'journal_mode': 'wal',
+                'busy_timeout': 5000,
+                'synchronous': 'normal',
+                'cache_size': -20000,
+                'temp_store': 'memory',
+                'mmap_size': 2 ** 27,
+            },
+        }
+    }
+
+
+# Реплики только для чтения (core.routers): DB_REPLICAS — через запятую
+# хосты PostgreSQL или, для SQLite, пути к файлам-копиям, которые
+# обновляет команда sync_replicas. После записи клиент ещё
+# DB_REPLICA_PIN_SECONDS секунд читает из основной базы.
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias]['HOST' if DB_ENGINE == 'postgresql' else 'NAME'] = (
+        location.strip())
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.getenv('DB_REPLICA_PIN_SECONDS', default='5'))
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -117,8 +214,107 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.perf': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Кэш по умолчанию свой у каждого процесса. CACHE_BACKEND=file или
+# CACHE_BACKEND=memcached (клиент python-memcached, например, через
+# unix-сокет) делают его общим для всех воркеров gunicorn.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('core.cache_backends.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'memcached': ('django.core.cache.backends.memcached.MemcachedCache',
+                  'unix:/tmp/memcached.sock'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('CACHE_BACKEND', default='locmem')]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default=CACHE_LOCATION),
     }
 }
+
+# Лента подписок: посты авторов, у которых подписчиков не меньше
+# TIMELINE_FANOUT_LIMIT, не раскладываются по лентам, а читаются при
+# открытии /follow/. Обратно к раскладке автор возвращается, когда
+# подписчиков становится меньше TIMELINE_FANOUT_LIMIT *
+# TIMELINE_PUSH_RATIO, чтобы режим не переключался от каждой подписки.
+# При подписке и возврате к раскладке в ленту добавляются последние
+# TIMELINE_BACKFILL_COUNT постов автора.
+TIMELINE_FANOUT_LIMIT = 5000
+TIMELINE_PUSH_RATIO = 0.8
+TIMELINE_BACKFILL_COUNT = 500
+
+# Граф подписок (posts.graph): сколько живёт кэш подписок пользователя,
+# сколько рекомендаций хранить и показывать в ленте подписок и сколько
+# людей на странице списков подписчиков и подписок.
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+FOLLOW_SUGGESTIONS_COUNT = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+FOLLOW_PAGING_COUNT = 30
+
+# Карточки постов в лентах кэшируются по id поста и времени его правки.
+POST_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы для анонимных читателей (core.page_cache) сбрасываются
+# сигналами при изменении данных; срок нужен на случай, если страницу
+# успели собрать с отстающей реплики. При 0 кэш страниц выключен.
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', default=60 * 10))
+
+# Побочные работы после записи (превью, поисковый индекс, раскладка
+# лент) идут через очередь задач в базе (core.tasks), их выполняет
+# команда run_tasks. С DEBUG и в тестах, где воркера нет, задачи
+# выполняются сразу, в запросе.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+TASKS_EAGER = os.getenv(
+    'TASKS_EAGER', default='1' if DEBUG or TESTING else '0') == '1'
+TASK_MAX_ATTEMPTS = 5
+# Пауза перед повтором, удваивается с каждой попыткой, в секундах.
+TASK_RETRY_DELAY = 10
+# Если воркер не закончил задачу за это время, её заберёт другой.
+TASK_LEASE_SECONDS = 60 * 5
+
+# Превью картинок постов готовятся задачей после сохранения, а не при
+# первой отрисовке страницы.
+# Ширины вариантов картинки для srcset и форматы сверх JPEG; форматы,
+# которые не умеет сохранять установленный Pillow, пропускаются.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_FORMATS = ('avif', 'webp')
+
+# Небольшие загрузки принимаются в память, остальные — во временный
+# файл; приём файла больше лимита прерывается, не дочитывая запрос.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'posts.uploads.BoundedUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 2 ** 20
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+# Более крупные оригиналы уменьшаются до этого размера по длинной стороне.
+POST_IMAGE_MAX_DIMENSION = 2560
+
+# Индекс поиска: 'auto' — FTS5, если он есть в SQLite, иначе SearchEntry;
+# 'fts5' или 'python' выбирают индекс явно.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
@@ -2,6 +2,12 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core import nav, template_cache
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны и меню готовятся при старте воркера, а не на первых запросах.
+template_cache.warm()
+nav.warm()